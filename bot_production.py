@@ -6,11 +6,15 @@ BuyerChina Telegram Bot - Production Version
 """
 
 import os
+import atexit
 import logging
+import queue
 import sys
 import signal
 import asyncio
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -59,7 +63,6 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     if hasattr(console_handler.stream, 'reconfigure'):
         console_handler.stream.reconfigure(encoding='utf-8')
-    logger.addHandler(console_handler)
     
     # Файл для всех логов
     file_handler = logging.FileHandler(
@@ -68,7 +71,6 @@ def setup_logging():
     )
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
     
     # Файл только для ошибок
     error_handler = logging.FileHandler(
@@ -77,7 +79,16 @@ def setup_logging():
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
+    
+    # Запись в консоль и файлы выполняется отдельным потоком, обработчики только кладут записи в очередь
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(
+        log_queue, console_handler, file_handler, error_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
     
     return logger
 
@@ -92,6 +103,13 @@ SEARCH_PRODUCT, VERIFY_SUPPLIER, TRACK_SHIPMENT, SELECT_LANGUAGE, ADMIN_PANEL =
 # Additional states for new functionality
 AWAIT_PRODUCT_DESCRIPTION, AWAIT_PRODUCT_IMAGE = range(5, 7)
 
+# Интервал записи накопленных изменений в Google Sheets (секунды)
+SHEETS_FLUSH_INTERVAL = 30
+
+# Записи в Google Sheets не должны пересекаться: фоновая запись в потоке
+# может ещё выполняться, когда при завершении запускается финальная
+_sheets_flush_lock = threading.Lock()
+
 # Global services - will be initialized in main()
 product_request_service = None
 supplier_service = None
@@ -202,17 +220,15 @@ async def button(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return ConversationHandler.END
         
         action = query.data.split('_')[1]
-        if action == 'all':
-            orders = admin_service.get_all_orders()
-            message = admin_service.format_orders_list(orders, language_service, user_id)
-        elif action == 'pending':
-            orders = admin_service.get_orders_by_status(OrderStatus.PENDING)
-            message = admin_service.format_orders_list(orders, language_service, user_id)
-        elif action == 'active':
-            active_orders = []
-            for status in [OrderStatus.CONFIRMED, OrderStatus.PRODUCTION, OrderStatus.SHIPPED]:
-                active_orders.extend(admin_service.get_orders_by_status(status))
-            message = admin_service.format_orders_list(active_orders, language_service, user_id)
+        statuses = {
+            'all': None,
+            'pending': [OrderStatus.PENDING],
+            'active': [OrderStatus.CONFIRMED, OrderStatus.PRODUCTION, OrderStatus.SHIPPED],
+        }
+        if action in statuses:
+            orders = admin_service.get_recent_orders(statuses=statuses[action])
+            total = admin_service.count_orders(statuses[action])
+            message = admin_service.format_orders_list(orders, language_service, user_id, total)
         else:
             message = "Unknown action"
         
@@ -389,6 +405,9 @@ async def handle_verification(update: Update, context: ContextTypes.DEFAULT_TYPE
         full_message = f"{message}\n\n{risk_assessment}"
     else:
         full_message = language_service.get_text(user_id, 'supplier_not_found', name=company_name)
+        suggestion = supplier_service.suggest_supplier(company_name)
+        if suggestion:
+            full_message += "\n\n" + language_service.get_text(user_id, 'supplier_did_you_mean', name=suggestion)
     
     verify_another_text = language_service.get_text(user_id, 'verify_another')
     back_text = language_service.get_text(user_id, 'back_menu')
@@ -643,6 +662,28 @@ async def health_check():
             logger.error(f"Ошибка в health_check: {e}")
             await asyncio.sleep(60)  # Короткая пауза при ошибке
 
+def flush_sheets():
+    """Записать накопленные изменения в Google Sheets (выполняется в отдельном потоке)"""
+    with _sheets_flush_lock:
+        google_sheets_service.flush()
+        if product_request_service:
+            product_request_service.flush()
+
+async def sheets_flush_loop():
+    """Периодическая запись накопленных изменений в Google Sheets"""
+    while not shutdown_event.is_set():
+        try:
+            await asyncio.sleep(SHEETS_FLUSH_INTERVAL)
+            
+            if google_sheets_service and google_sheets_service.is_connected():
+                # Запросы к Google API блокирующие - выполняем вне event loop
+                await asyncio.to_thread(flush_sheets)
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка в sheets_flush_loop: {e}")
+
 async def main():
     """Start the bot with enhanced error handling and monitoring."""
     if not TOKEN:
@@ -689,6 +730,7 @@ async def main():
     try:
         # Запускаем health check в фоне
         health_task = asyncio.create_task(health_check())
+        sheets_flush_task = asyncio.create_task(sheets_flush_loop())
         
         # Start the Bot with polling
         await application.initialize()
@@ -717,6 +759,13 @@ async def main():
         if 'health_task' in locals():
             health_task.cancel()
         
+        # Останавливаем фоновую запись и сохраняем оставшиеся изменения
+        if 'sheets_flush_task' in locals():
+            sheets_flush_task.cancel()
+        if google_sheets_service and google_sheets_service.is_connected():
+            # Дожидается незавершённой фоновой записи, если она ещё идёт
+            await asyncio.to_thread(flush_sheets)
+        
         # Graceful shutdown
         if application.updater.running:
             await application.updater.stop()
@@ -55,21 +55,6 @@ def get_file_info(file_id):
         logger.error(f"Get file info error: {e}")
         return None
 
-def download_file(file_path):
-    """Скачивание файла с серверов Telegram"""
-    try:
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-        response = requests.get(file_url, timeout=30)
-        
-        if response.status_code == 200:
-            return response.content
-        else:
-            logger.error(f"Failed to download file: {response.status_code}")
-            return None
-    except Exception as e:
-        logger.error(f"Download file error: {e}")
-        return None
-
 def get_file_type_info(file_name):
     """Определение типа файла и его описания"""
     if not file_name:
@@ -78,11 +63,11 @@ def get_file_type_info(file_name):
     file_name_lower = file_name.lower()
     
     # Изображения
-    if any(file_name_lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']):
+    if file_name_lower.endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')):
         return "photo", "📸 Изображение"
     
     # Excel файлы
-    elif any(file_name_lower.endswith(ext) for ext in ['.xlsx', '.xls', '.xlsm']):
+    elif file_name_lower.endswith(('.xlsx', '.xls', '.xlsm')):
         return "excel", "📊 Excel таблица"
     
     # PDF файлы
@@ -90,11 +75,11 @@ def get_file_type_info(file_name):
         return "pdf", "📄 PDF документ"
     
     # Word файлы
-    elif any(file_name_lower.endswith(ext) for ext in ['.docx', '.doc']):
+    elif file_name_lower.endswith(('.docx', '.doc')):
         return "word", "📝 Word документ"
     
     # Другие документы
-    elif any(file_name_lower.endswith(ext) for ext in ['.txt', '.rtf']):
+    elif file_name_lower.endswith(('.txt', '.rtf')):
         return "document", "📄 Текстовый документ"
     
     else:
@@ -523,9 +508,8 @@ def webhook():
             elif 'photo' in message:
                 username = message.get('from', {}).get('username', 'Unknown')
                 
-                # Получаем информацию о самом большом фото
-                photos = message['photo']
-                largest_photo = max(photos, key=lambda x: x.get('file_size', 0))
+                # Telegram присылает размеры фото по возрастанию - последний самый большой
+                largest_photo = message['photo'][-1]
                 file_id = largest_photo['file_id']
                 
                 # Получаем информацию о файле
@@ -4,9 +4,13 @@
 import os
 import logging
 import json
+import re
 from flask import Flask, request, jsonify
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+from concurrent.futures import ThreadPoolExecutor
 import mimetypes
 from urllib.parse import urlparse
 
@@ -28,19 +32,37 @@ if not BOT_TOKEN:
 BOT_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
 logger.info(f"Bot initialized: {BOT_TOKEN[:10]}...")
 
+# Общая HTTP-сессия: соединения с api.telegram.org переиспользуются (keep-alive),
+# обрывы соединения повторяются с экспоненциальной паузой
+http_session = requests.Session()
+http_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+)
+http_session.mount('https://', http_adapter)
+
 # Настройки менеджера
 MANAGER_CHAT_ID = int(os.getenv('MANAGER_CHAT_ID', '1169659218'))
 logger.info(f"Manager chat ID: {MANAGER_CHAT_ID}")
 
+def parse_api_response(response):
+    """Разбор ответа Telegram API: JSON парсится один раз, HTML-страницы ошибок отсекаются"""
+    try:
+        return response.json()
+    except ValueError:
+        logger.error(f"❌ Non-JSON response from Telegram API: HTTP {response.status_code}")
+        return None
+
 def get_file_info(file_id):
     """Получение информации о файле"""
     try:
         url = f"{BOT_URL}/getFile"
         data = {'file_id': file_id}
-        response = requests.post(url, json=data, timeout=15)
-        result = response.json()
+        response = http_session.post(url, json=data, timeout=15)
+        result = parse_api_response(response)
         
-        if result.get('ok'):
+        if result and result.get('ok'):
             return result['result']
         else:
             logger.error(f"Failed to get file info: {result}")
@@ -49,20 +71,55 @@ def get_file_info(file_id):
         logger.error(f"Get file info error: {e}")
         return None
 
-def download_file(file_path):
-    """Скачивание файла с серверов Telegram"""
+# Сигнатуры (magic bytes) поддерживаемых форматов документов
+MAGIC_SIGNATURES = {
+    b'%PDF': 'pdf',
+    b'PK\x03\x04': 'zip',            # xlsx, xlsm, docx
+    b'\xD0\xCF\x11\xE0': 'ole2',     # xls, doc
+}
+
+# Какие сигнатуры допустимы для каждого типа по расширению
+EXPECTED_SIGNATURES = {
+    'excel': ('zip', 'ole2'),
+    'word': ('zip', 'ole2'),
+    'pdf': ('pdf',),
+}
+
+def download_file_head(file_path, size=16):
+    """Скачивание только первых байт файла для проверки сигнатуры"""
     try:
         file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-        response = requests.get(file_url, timeout=30)
-        
-        if response.status_code == 200:
-            return response.content
-        else:
-            logger.error(f"Failed to download file: {response.status_code}")
-            return None
+        headers = {'Range': f'bytes=0-{size - 1}'}
+        with http_session.get(file_url, headers=headers, stream=True, timeout=15) as response:
+            if response.status_code not in (200, 206):
+                logger.error(f"Failed to download file head: {response.status_code}")
+                return None
+            return response.raw.read(size)
     except Exception as e:
-        logger.error(f"Download file error: {e}")
+        logger.error(f"Download file head error: {e}")
+        return None
+
+def sniff_magic(head):
+    """Определение формата по первым байтам файла"""
+    if not head:
         return None
+    for signature, kind in MAGIC_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    return None
+
+def check_file_content(file_type, file_path):
+    """Проверка, что содержимое документа соответствует расширению"""
+    expected = EXPECTED_SIGNATURES.get(file_type)
+    if not expected or not file_path:
+        return True
+
+    head = download_file_head(file_path)
+    if head is None:
+        # Не удалось скачать - не блокируем заявку
+        return True
+
+    return sniff_magic(head) in expected
 
 def get_file_type_info(file_name):
     """Определение типа файла и его описания"""
@@ -72,11 +129,11 @@ def get_file_type_info(file_name):
     file_name_lower = file_name.lower()
     
     # Изображения
-    if any(file_name_lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']):
+    if file_name_lower.endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')):
         return "photo", "📸 Изображение"
     
     # Excel файлы
-    elif any(file_name_lower.endswith(ext) for ext in ['.xlsx', '.xls', '.xlsm']):
+    elif file_name_lower.endswith(('.xlsx', '.xls', '.xlsm')):
         return "excel", "📊 Excel таблица"
     
     # PDF файлы
@@ -84,11 +141,11 @@ def get_file_type_info(file_name):
         return "pdf", "📄 PDF документ"
     
     # Word файлы
-    elif any(file_name_lower.endswith(ext) for ext in ['.docx', '.doc']):
+    elif file_name_lower.endswith(('.docx', '.doc')):
         return "word", "📝 Word документ"
     
     # Другие документы
-    elif any(file_name_lower.endswith(ext) for ext in ['.txt', '.rtf']):
+    elif file_name_lower.endswith(('.txt', '.rtf')):
         return "document", "📄 Текстовый документ"
     
     else:
@@ -109,12 +166,15 @@ def send_message(chat_id, text, parse_mode=None):
         logger.info(f"Message text: {text[:100]}...")
         logger.info(f"Request data: {data}")
         
-        response = requests.post(url, json=data, timeout=15)
-        result = response.json()
+        response = http_session.post(url, json=data, timeout=15)
+        result = parse_api_response(response)
         
         logger.info(f"Response status: {response.status_code}")
         logger.info(f"Response body: {result}")
         
+        if result is None:
+            return None
+        
         # Дополнительная диагностика ошибок
         if not result.get('ok'):
             error_code = result.get('error_code')
@@ -152,8 +212,8 @@ def send_photo(chat_id, file_id, caption=None):
         
         logger.info(f"Sending photo to chat_id: {chat_id}, file_id: {file_id}")
         
-        response = requests.post(url, json=data, timeout=15)
-        result = response.json()
+        response = http_session.post(url, json=data, timeout=15)
+        result = parse_api_response(response)
         
         logger.info(f"Photo send result: {result}")
         return result
@@ -175,8 +235,8 @@ def send_document(chat_id, file_id, caption=None):
         
         logger.info(f"Sending document to chat_id: {chat_id}, file_id: {file_id}")
         
-        response = requests.post(url, json=data, timeout=15)
-        result = response.json()
+        response = http_session.post(url, json=data, timeout=15)
+        result = parse_api_response(response)
         
         logger.info(f"Document send result: {result}")
         return result
@@ -185,35 +245,41 @@ def send_document(chat_id, file_id, caption=None):
         logger.error(f"❌ Send document error: {e}")
         return None
 
+# Ключевые слова заказа (ищутся как подстроки)
+ORDER_KEYWORDS = (
+    'купить', 'заказать', 'найти', 'нужно', 'хочу', 'ищу', 'товар', 'цена', 'стоимость',
+    'доставка', 'китай', 'алиэкспресс', 'alibaba', 'taobao', '1688', 'dhgate',
+    'сколько стоит', 'где купить', 'как заказать', 'помогите найти', 'помочь найти'
+)
+ORDER_KEYWORDS_RE = re.compile('|'.join(re.escape(keyword) for keyword in ORDER_KEYWORDS))
+
+# Фразы, которые не являются заказом (точное совпадение)
+EXCLUDE_PHRASES = frozenset({
+    'привет', 'hello', 'hi', 'спасибо', 'thanks', 'ok', 'да', 'нет', 'yes', 'no',
+    'хорошо', 'понятно', 'ясно', 'ок', 'окей', 'okay'
+})
+
 def is_real_order(text):
     """Проверка является ли сообщение реальным заказом"""
-    if not text or len(text.strip()) < 5:
+    if not text:
         return False
-    
-    order_keywords = [
-        'купить', 'заказать', 'найти', 'нужно', 'хочу', 'ищу', 'товар', 'цена', 'стоимость',
-        'доставка', 'китай', 'алиэкспресс', 'alibaba', 'taobao', '1688', 'dhgate',
-        'сколько стоит', 'где купить', 'как заказать', 'помогите найти', 'помочь найти'
-    ]
-    
-    exclude_phrases = [
-        'привет', 'hello', 'hi', 'спасибо', 'thanks', 'ok', 'да', 'нет', 'yes', 'no',
-        'хорошо', 'понятно', 'ясно', 'ок', 'окей', 'okay'
-    ]
-    
-    text_lower = text.lower().strip()
-    
-    if text_lower in exclude_phrases:
+
+    # Дешевые проверки первыми: длина и команды не требуют casefold/regex
+    stripped = text.strip()
+    length = len(stripped)
+    if length < 5 or stripped[0] == '/':
         return False
-    
-    for keyword in order_keywords:
-        if keyword in text_lower:
-            return True
-    
-    if len(text.strip()) > 20:
+
+    # Длинные сообщения считаются заказом без поиска ключевых слов
+    if length > 20:
         return True
-    
-    return False
+
+    text_lower = stripped.casefold()
+
+    if text_lower in EXCLUDE_PHRASES:
+        return False
+
+    return bool(ORDER_KEYWORDS_RE.search(text_lower))
 
 def notify_manager(user_id, username, user_name, message_type, content, file_info=None, file_id=None):
     """Уведомление менеджера с детальной диагностикой и повторными попытками"""
@@ -232,13 +298,18 @@ def notify_manager(user_id, username, user_name, message_type, content, file_inf
                     file_type_desc = "📝 Word документ с товарами"
                 else:
                     file_type_desc = f"{file_desc} ({file_info.get('file_name', 'без названия')})"
-            
+
+            content_warning = ""
+            if file_info and file_info.get('content_mismatch'):
+                content_warning = "⚠️ Содержимое файла не соответствует расширению!\n\n"
+
             notification_text = (
                 f"🚨 НОВЫЙ ЗАПРОС - ФАЙЛ\n\n"
                 f"👤 Пользователь: {user_name}\n"
                 f"📱 Username: @{username if username else 'не указан'}\n"
                 f"🆔 ID: {user_id}\n\n"
                 f"📎 Пользователь загрузил {file_type_desc} для поиска товаров в Китае.\n\n"
+                f"{content_warning}"
                 f"⏰ ТРЕБУЕТСЯ СВЯЗАТЬСЯ В ТЕЧЕНИЕ 15 МИНУТ!"
             )
         else:
@@ -307,8 +378,8 @@ def get_chat_info(chat_id):
     try:
         url = f"{BOT_URL}/getChat"
         data = {'chat_id': str(chat_id)}
-        response = requests.post(url, json=data, timeout=10)
-        result = response.json()
+        response = http_session.post(url, json=data, timeout=10)
+        result = parse_api_response(response)
         logger.info(f"Chat info for {chat_id}: {result}")
         return result
     except Exception as e:
@@ -319,7 +390,7 @@ def get_bot_info():
     """Получение информации о боте"""
     try:
         url = f"{BOT_URL}/getMe"
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         return response.json()
     except Exception as e:
         logger.error(f"Get bot info error: {e}")
@@ -342,11 +413,11 @@ def setup_webhook():
         logger.info(f"Setting webhook to: {webhook_url}")
         
         delete_url = f"{BOT_URL}/deleteWebhook"
-        requests.post(delete_url, timeout=10)
+        http_session.post(delete_url, timeout=10)
         
         set_url = f"{BOT_URL}/setWebhook"
         data = {'url': webhook_url}
-        response = requests.post(set_url, json=data, timeout=15)
+        response = http_session.post(set_url, json=data, timeout=15)
         result = response.json()
         
         logger.info(f"Webhook setup result: {result}")
@@ -367,6 +438,18 @@ def health():
         "message": "BuyerChina Bot is running!"
     }), 200
 
+def evaluate_manager_status(chat_info, send_result):
+    """Оценка доступности менеджера по результатам getChat и тестовой отправки"""
+    if not chat_info or not chat_info.get('ok'):
+        return False, "Chat info unavailable"
+
+    if send_result and send_result.get('ok'):
+        return True, "Manager available"
+
+    error_code = send_result.get('error_code') if send_result else 'No response'
+    description = send_result.get('description') if send_result else 'Unknown error'
+    return False, f"Error {error_code}: {description}"
+
 def check_manager_status():
     """Проверка доступности менеджера"""
     try:
@@ -379,12 +462,7 @@ def check_manager_status():
         test_message = f"🔧 Проверка связи - {time.strftime('%H:%M:%S')}"
         result = send_message(MANAGER_CHAT_ID, test_message)
         
-        if result and result.get('ok'):
-            return True, "Manager available"
-        else:
-            error_code = result.get('error_code') if result else 'No response'
-            description = result.get('description') if result else 'Unknown error'
-            return False, f"Error {error_code}: {description}"
+        return evaluate_manager_status(chat_info, result)
             
     except Exception as e:
         return False, f"Exception: {str(e)}"
@@ -395,27 +473,24 @@ def debug_manager():
     try:
         results = {}
         
-        # 1. Проверяем статус менеджера
+        # 1-2. Запрашиваем информацию о чате и отправляем тестовое сообщение параллельно
         logger.info(f"🔍 Checking manager status for {MANAGER_CHAT_ID}")
-        manager_available, status_message = check_manager_status()
+        test_message = f"🧪 ТЕСТ СОЕДИНЕНИЯ - {time.strftime('%H:%M:%S')}"
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            chat_future = executor.submit(get_chat_info, MANAGER_CHAT_ID)
+            send_future = executor.submit(send_message, MANAGER_CHAT_ID, test_message)
+            chat_info = chat_future.result()
+            send_result = send_future.result()
+        
+        manager_available, status_message = evaluate_manager_status(chat_info, send_result)
         results['manager_status'] = {
             'available': manager_available,
             'message': status_message
         }
-        
-        # 2. Проверяем информацию о чате менеджера
-        logger.info(f"🔍 Getting chat info for manager {MANAGER_CHAT_ID}")
-        chat_info = get_chat_info(MANAGER_CHAT_ID)
         results['chat_info'] = chat_info
-        
-        # 3. Пробуем отправить простое сообщение
-        logger.info("📤 Attempting to send test message")
-        test_message = f"🧪 ТЕСТ СОЕДИНЕНИЯ - {time.strftime('%H:%M:%S')}"
-        send_result = send_message(MANAGER_CHAT_ID, test_message)
         results['send_test'] = send_result
         
-        # 4. Пробуем отправить полное уведомление
-        time.sleep(1)
+        # 3. Пробуем отправить полное уведомление
         logger.info("📤 Attempting to send full notification")
         notification_result = notify_manager(
             user_id="DEBUG_123",
@@ -426,7 +501,7 @@ def debug_manager():
         )
         results['notification_test'] = notification_result
         
-        # 5. Рекомендации по исправлению
+        # 4. Рекомендации по исправлению
         recommendations = []
         if not manager_available:
             if 'blocked' in status_message.lower() or '403' in status_message:
@@ -456,7 +531,7 @@ def find_chat_id():
     try:
         # Получаем последние обновления
         url = f"{BOT_URL}/getUpdates"
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         result = response.json()
         
         if result.get('ok') and result.get('result'):
@@ -509,7 +584,7 @@ def webhook_info():
     """Информация о webhook"""
     try:
         url = f"{BOT_URL}/getWebhookInfo"
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         return jsonify(response.json())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -571,9 +646,8 @@ def webhook():
         elif 'photo' in message:
             logger.info(f"📸 Photo received from {user_name}")
             
-            # Получаем информацию о самом большом фото
-            photos = message['photo']
-            largest_photo = max(photos, key=lambda x: x.get('file_size', 0))
+            # Telegram присылает размеры фото по возрастанию - последний самый большой
+            largest_photo = message['photo'][-1]
             file_id = largest_photo['file_id']
             
             # Получаем информацию о файле
@@ -622,7 +696,12 @@ def webhook():
             if file_info:
                 file_info['file_name'] = file_name
                 file_info['file_type'] = file_type
-            
+
+                # Проверяем содержимое по сигнатуре, а не только по расширению
+                if not check_file_content(file_type, file_info.get('file_path')):
+                    logger.warning(f"⚠️ File content does not match extension: {file_name}")
+                    file_info['content_mismatch'] = True
+
             logger.info(f"Document file info: {file_info}")
             
             notification_sent = notify_manager(user_id, username, user_name, "document", f"Документ: {file_name}", file_info, file_id)
@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 import logging
 import sys
+import threading
 
 # Настройка логирования
 logging.basicConfig(
@@ -31,22 +31,29 @@ def setup_environment():
         # Настраиваем credentials.json
         credentials_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
         if credentials_json:
-            try:
-                # Проверяем что это валидный JSON
-                json.loads(credentials_json)
-                
-                # Создаем файл
-                with open('credentials.json', 'w', encoding='utf-8') as f:
-                    f.write(credentials_json)
-                
-                logger.info("✅ credentials.json created")
-                
-                # Устанавливаем переменную для Google
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Invalid JSON in GOOGLE_CREDENTIALS_JSON: {e}")
+            # Дешевая проверка структуры - полную валидацию выполнит google-auth при загрузке
+            stripped = credentials_json.strip()
+            if not (stripped.startswith('{') and stripped.endswith('}')):
+                logger.error("❌ Invalid JSON in GOOGLE_CREDENTIALS_JSON: expected a JSON object")
                 return False
+            
+            # При перезапуске файл уже может быть записан - не переписываем его.
+            # Сравнивается содержимое: после ротации ключа размер файла не меняется
+            encoded = credentials_json.encode('utf-8')
+            existing = None
+            if os.path.exists('credentials.json'):
+                with open('credentials.json', 'rb') as f:
+                    existing = f.read()
+            if existing == encoded:
+                logger.info("✅ credentials.json already up to date")
+            else:
+                with open('credentials.json', 'wb') as f:
+                    f.write(encoded)
+                logger.info("✅ credentials.json created")
+            
+            # Устанавливаем переменную для Google
+            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
+            
         else:
             logger.warning("⚠️ GOOGLE_CREDENTIALS_JSON not found - Google Sheets disabled")
         
@@ -56,17 +63,36 @@ def setup_environment():
         logger.error(f"❌ Environment setup failed: {e}")
         return False
 
+def import_app(result):
+    """Импорт Flask приложения (выполняется параллельно с настройкой окружения)"""
+    try:
+        from main import app
+        result['app'] = app
+    except Exception as e:
+        result['error'] = e
+
 def main():
     """Главная функция запуска"""
     logger.info("🚀 Starting BuyerChina Bot on Railway...")
     
+    # Импорт приложения не зависит от credentials.json - запускаем его сразу,
+    # но только при наличии токена (иначе настройка окружения все равно упадет)
+    import_result = {}
+    import_thread = None
+    if os.getenv('TELEGRAM_BOT_TOKEN'):
+        import_thread = threading.Thread(target=import_app, args=(import_result,), daemon=True)
+        import_thread.start()
+    
     if not setup_environment():
         logger.error("❌ Environment setup failed!")
         sys.exit(1)
     
     try:
-        # Импортируем и запускаем Flask приложение
-        from main import app
+        # Дожидаемся импорта и запускаем Flask приложение
+        import_thread.join()
+        if 'error' in import_result:
+            raise import_result['error']
+        app = import_result['app']
         logger.info("🤖 Launching Flask app...")
         
         # Получаем порт от Railway
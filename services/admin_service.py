@@ -1,16 +1,36 @@
-from typing import Dict, List, Set, Optional
-from datetime import datetime
-from .order_management import Order, OrderStatus, OrderManagementService
+from typing import FrozenSet, Iterable, Iterator, List, Mapping, Set, Optional
+import heapq
+from datetime import datetime, timedelta
+from .order_management import Order, OrderStatus, OrderManagementService, STATUS_EMOJI
 from .logistics_tracking import LogisticsTrackingService
+from .language_service import LanguageService
+
+# Список ID администраторов (в реальном проекте это должно быть в базе данных)
+ADMIN_USERS: FrozenSet[int] = frozenset({
+    123456789,  # Замените на реальные Telegram ID администраторов
+    987654321,  # Добавьте ID менеджеров BuyerChina
+    1169659218  # Ваш Telegram ID для тестирования
+})
+
+# Сколько заказов показывать в списке администратора
+ORDERS_PAGE_SIZE = 10
+
+# За сколько последних дней по умолчанию выбираются заказы (None - вся история)
+ORDERS_WINDOW_DAYS = 30
+
+# Ключи каталога переводов, используемые панелью администратора
+ADMIN_TEXT_KEYS = (
+    'admin_dashboard', 'order_statistics', 'total_orders',
+    'pending_orders', 'confirmed_orders', 'production_orders',
+    'shipped_orders', 'delivered_orders', 'cancelled_orders',
+    'total_amount', 'select_action', 'orders_list', 'no_orders_found',
+    'more_orders', 'user_id',
+)
 
 class AdminService:
     def __init__(self, order_service: OrderManagementService, logistics_service: LogisticsTrackingService, google_sheets_service=None):
-        # Список ID администраторов (в реальном проекте это должно быть в базе данных)
-        self.admin_users: Set[int] = {
-            123456789,  # Замените на реальные Telegram ID администраторов
-            987654321,  # Добавьте ID менеджеров BuyerChina
-            1169659218  # Ваш Telegram ID для тестирования
-        }
+        # Администраторы, добавленные во время работы (в дополнение к ADMIN_USERS)
+        self._extra_admins: Set[int] = set()
         
         self.order_service = order_service
         self.logistics_service = logistics_service
@@ -18,7 +38,11 @@ class AdminService:
     
     def is_admin(self, user_id: int) -> bool:
         """Проверить, является ли пользователь администратором"""
-        return user_id in self.admin_users
+        return user_id in ADMIN_USERS or user_id in self._extra_admins
+    
+    def get_admin_ids(self) -> List[int]:
+        """Получить ID всех администраторов"""
+        return sorted(ADMIN_USERS | self._extra_admins)
     
     def get_google_sheets_url(self) -> Optional[str]:
         """Получить ссылку на Google Sheets таблицу"""
@@ -39,125 +63,127 @@ class AdminService:
     
     def add_admin(self, user_id: int) -> bool:
         """Добавить администратора"""
-        self.admin_users.add(user_id)
+        if user_id not in ADMIN_USERS:
+            self._extra_admins.add(user_id)
         return True
     
     def remove_admin(self, user_id: int) -> bool:
         """Удалить администратора"""
-        if user_id in self.admin_users:
-            self.admin_users.remove(user_id)
+        # Администраторы из ADMIN_USERS заданы в коде и не удаляются
+        if user_id in self._extra_admins:
+            self._extra_admins.remove(user_id)
             return True
         return False
     
-    def get_all_orders(self) -> List[Order]:
-        """Получить все заказы для администраторов"""
-        all_orders = []
-        for orders in self.order_service.user_orders.values():
-            for order_id in orders:
+    def _iter_all_orders(self, since: Optional[datetime] = None) -> Iterator[Order]:
+        """Обход заказов (начиная с since) без построения промежуточного списка"""
+        if since is None:
+            return iter(self.order_service.iter_orders())
+        return self.order_service.iter_orders_since(since)
+    
+    @staticmethod
+    def _window_start(days: Optional[int]) -> Optional[datetime]:
+        """Начало окна выборки за последние days дней"""
+        if days is None:
+            return None
+        return datetime.now() - timedelta(days=days)
+    
+    def get_all_orders(self, days: Optional[int] = ORDERS_WINDOW_DAYS) -> List[Order]:
+        """Получить заказы за последние days дней (days=None - вся история, для выгрузок)"""
+        orders = self._iter_all_orders(self._window_start(days))
+        return sorted(orders, key=lambda x: x.created_date, reverse=True)
+    
+    def _iter_orders_by_status(self, statuses: Iterable[OrderStatus], since: Optional[datetime] = None) -> Iterator[Order]:
+        """Обход заказов с заданными статусами по индексу сервиса заказов"""
+        for status in statuses:
+            for order_id in self.order_service.get_order_ids_by_status(status):
                 order = self.order_service.get_order(order_id)
-                if order:
-                    all_orders.append(order)
-        return sorted(all_orders, key=lambda x: x.created_date, reverse=True)
+                if order and (since is None or order.created_date >= since):
+                    yield order
+    
+    def _iter_orders(self, statuses: Iterable[OrderStatus] = None, days: Optional[int] = ORDERS_WINDOW_DAYS) -> Iterator[Order]:
+        """Обход заказов за последние days дней (опционально по статусам)"""
+        since = self._window_start(days)
+        if statuses is None:
+            return self._iter_all_orders(since)
+        return self._iter_orders_by_status(set(statuses), since)
     
-    def get_orders_by_status(self, status: OrderStatus) -> List[Order]:
-        """Получить заказы по статусу"""
-        all_orders = self.get_all_orders()
-        return [order for order in all_orders if order.status == status]
+    def get_recent_orders(self, limit: int = ORDERS_PAGE_SIZE, statuses: Iterable[OrderStatus] = None, days: Optional[int] = ORDERS_WINDOW_DAYS) -> List[Order]:
+        """Получить последние заказы за days дней (опционально по статусам, days=None - вся история)"""
+        return heapq.nlargest(limit, self._iter_orders(statuses, days), key=lambda x: x.created_date)
+    
+    def count_orders(self, statuses: Iterable[OrderStatus] = None, days: Optional[int] = ORDERS_WINDOW_DAYS) -> int:
+        """Количество заказов за days дней (опционально по статусам, days=None - вся история)"""
+        if days is None:
+            # Вся история считается по агрегатам сервиса заказов
+            status_counts, _, total_orders = self.order_service.get_dashboard_stats()
+            if statuses is None:
+                return total_orders
+            return sum(status_counts[status] for status in statuses)
+        return sum(1 for _ in self._iter_orders(statuses, days))
+    
+    def get_orders_by_status(self, status: OrderStatus, days: Optional[int] = ORDERS_WINDOW_DAYS) -> List[Order]:
+        """Получить заказы по статусу за последние days дней (days=None - вся история)"""
+        orders = self._iter_orders_by_status([status], self._window_start(days))
+        return sorted(orders, key=lambda x: x.created_date, reverse=True)
     
     def format_admin_dashboard(self, language_service=None, user_id=None) -> str:
         """Форматировать панель администратора"""
-        all_orders = self.get_all_orders()
-        
-        # Статистика по статусам
-        status_counts = {}
-        for status in OrderStatus:
-            status_counts[status] = len([o for o in all_orders if o.status == status])
+        # Агрегаты поддерживаются сервисом заказов - полный обход не нужен
+        status_counts, total_amount, total_orders = self.order_service.get_dashboard_stats()
         
-        total_amount = sum(order.total_amount for order in all_orders)
+        t = self._resolve_locale(language_service, user_id)
         
-        if language_service and user_id:
-            lang = language_service.get_user_language(user_id)
-            if lang == 'ru':
-                message = "👨‍💼 **Панель администратора BuyerChina**\n\n"
-                message += f"📊 **Статистика заказов:**\n"
-                message += f"• Всего заказов: {len(all_orders)}\n"
-                message += f"• Ожидают: {status_counts[OrderStatus.PENDING]}\n"
-                message += f"• Подтверждены: {status_counts[OrderStatus.CONFIRMED]}\n"
-                message += f"• В производстве: {status_counts[OrderStatus.PRODUCTION]}\n"
-                message += f"• Отправлены: {status_counts[OrderStatus.SHIPPED]}\n"
-                message += f"• Доставлены: {status_counts[OrderStatus.DELIVERED]}\n"
-                message += f"• Отменены: {status_counts[OrderStatus.CANCELLED]}\n\n"
-                message += f"💰 **Общая сумма:** ${total_amount:,.2f}\n\n"
-                message += "Выберите действие:"
-            else:
-                message = "👨‍💼 **BuyerChina Admin Dashboard**\n\n"
-                message += f"📊 **Order Statistics:**\n"
-                message += f"• Total Orders: {len(all_orders)}\n"
-                message += f"• Pending: {status_counts[OrderStatus.PENDING]}\n"
-                message += f"• Confirmed: {status_counts[OrderStatus.CONFIRMED]}\n"
-                message += f"• In Production: {status_counts[OrderStatus.PRODUCTION]}\n"
-                message += f"• Shipped: {status_counts[OrderStatus.SHIPPED]}\n"
-                message += f"• Delivered: {status_counts[OrderStatus.DELIVERED]}\n"
-                message += f"• Cancelled: {status_counts[OrderStatus.CANCELLED]}\n\n"
-                message += f"💰 **Total Amount:** ${total_amount:,.2f}\n\n"
-                message += "Select an action:"
-        else:
-            message = "👨‍💼 **BuyerChina Admin Dashboard**\n\n"
-            message += f"📊 **Order Statistics:**\n"
-            message += f"• Total Orders: {len(all_orders)}\n"
-            message += f"• Pending: {status_counts[OrderStatus.PENDING]}\n"
-            message += f"• Confirmed: {status_counts[OrderStatus.CONFIRMED]}\n"
-            message += f"• In Production: {status_counts[OrderStatus.PRODUCTION]}\n"
-            message += f"• Shipped: {status_counts[OrderStatus.SHIPPED]}\n"
-            message += f"• Delivered: {status_counts[OrderStatus.DELIVERED]}\n"
-            message += f"• Cancelled: {status_counts[OrderStatus.CANCELLED]}\n\n"
-            message += f"💰 **Total Amount:** ${total_amount:,.2f}\n\n"
-            message += "Select an action:"
-        
-        return message
+        return (
+            f"{t['admin_dashboard']}\n\n"
+            f"{t['order_statistics']}\n"
+            f"• {t['total_orders']} {total_orders}\n"
+            f"• {t['pending_orders']} {status_counts[OrderStatus.PENDING]}\n"
+            f"• {t['confirmed_orders']} {status_counts[OrderStatus.CONFIRMED]}\n"
+            f"• {t['production_orders']} {status_counts[OrderStatus.PRODUCTION]}\n"
+            f"• {t['shipped_orders']} {status_counts[OrderStatus.SHIPPED]}\n"
+            f"• {t['delivered_orders']} {status_counts[OrderStatus.DELIVERED]}\n"
+            f"• {t['cancelled_orders']} {status_counts[OrderStatus.CANCELLED]}\n\n"
+            f"{t['total_amount']} ${total_amount:,.2f}\n\n"
+            f"{t['select_action']}"
+        )
     
-    def format_orders_list(self, orders: List[Order], language_service=None, user_id=None) -> str:
-        """Форматировать список заказов для администратора"""
+    def format_orders_list(self, orders: List[Order], language_service=None, user_id=None, total: int = None) -> str:
+        """Форматировать страницу заказов для администратора (total - общее количество заказов)"""
+        t = self._resolve_locale(language_service, user_id)
+        
         if not orders:
-            if language_service and user_id:
-                lang = language_service.get_user_language(user_id)
-                if lang == 'ru':
-                    return "📦 Заказы не найдены."
-            return "📦 No orders found."
+            return t['no_orders_found']
         
-        if language_service and user_id:
-            lang = language_service.get_user_language(user_id)
-            if lang == 'ru':
-                message = f"📋 **Список заказов ({len(orders)} шт.)**\n\n"
-            else:
-                message = f"📋 **Orders List ({len(orders)} total)**\n\n"
-        else:
-            message = f"📋 **Orders List ({len(orders)} total)**\n\n"
+        if total is None:
+            total = len(orders)
         
-        for order in orders[:10]:  # Показать первые 10 заказов
-            status_emoji = self.order_service._get_status_emoji(order.status)
-            message += f"**{order.order_id}** {status_emoji}\n"
-            message += f"👤 User ID: {order.user_id}\n"
-            message += f"🏭 {order.supplier}\n"
-            message += f"💰 ${order.total_amount:,.2f}\n"
-            message += f"📅 {order.created_date.strftime('%Y-%m-%d %H:%M')}\n"
-            
-            if order.tracking_number:
-                message += f"📦 {order.tracking_number}\n"
-            
-            message += "\n"
+        parts = [t['orders_list'].format(count=total) + "\n\n"]
         
-        if len(orders) > 10:
-            if language_service and user_id:
-                lang = language_service.get_user_language(user_id)
-                if lang == 'ru':
-                    message += f"... и еще {len(orders) - 10} заказов"
-                else:
-                    message += f"... and {len(orders) - 10} more orders"
-            else:
-                message += f"... and {len(orders) - 10} more orders"
+        for order in orders:
+            status_emoji = STATUS_EMOJI.get(order.status, "❓")
+            tracking_line = f"📦 {order.tracking_number}\n" if order.tracking_number else ""
+            parts.append(
+                f"**{order.order_id}** {status_emoji}\n"
+                f"👤 {t['user_id']} {order.user_id}\n"
+                f"🏭 {order.supplier}\n"
+                f"💰 ${order.total_amount:,.2f}\n"
+                f"📅 {order.created_date_str[:16]}\n"
+                f"{tracking_line}\n"
+            )
+        
+        remaining = total - len(orders)
+        if remaining > 0:
+            parts.append(t['more_orders'].format(count=remaining))
         
-        return message
+        return "".join(parts)
+    
+    @staticmethod
+    def _resolve_locale(language_service=None, user_id=None) -> Mapping[str, str]:
+        """Тексты панели администратора из каталога переводов (одна выборка на рендер)"""
+        if language_service and user_id:
+            return language_service.get_texts(user_id, ADMIN_TEXT_KEYS)
+        return LanguageService.default_catalog()
     
     def update_order_status(self, order_id: str, new_status: OrderStatus, tracking_number: str = None) -> bool:
         """Обновить статус заказа"""
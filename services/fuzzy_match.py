@@ -0,0 +1,25 @@
+from typing import Collection, Optional
+
+try:
+    # Расстояние Левенштейна на C; без rapidfuzz используется difflib из стандартной библиотеки
+    from rapidfuzz import fuzz, process
+except ImportError:
+    process = None
+    import difflib
+
+# Минимальная похожесть (0-100), при которой строка считается совпадением.
+# Обе ветки считают нормированную похожесть по совпадающим символам (fuzz.ratio и
+# SequenceMatcher.ratio), поэтому порог значит одно и то же с rapidfuzz и без него
+FUZZY_SCORE_CUTOFF = 80
+
+def best_match(query: str, choices: Collection[str], score_cutoff: int = FUZZY_SCORE_CUTOFF) -> Optional[str]:
+    """Наиболее похожая на query строка из choices (None, если похожих нет)"""
+    if not query or not choices:
+        return None
+
+    if process is not None:
+        match = process.extractOne(query, choices, scorer=fuzz.ratio, score_cutoff=score_cutoff)
+        return match[0] if match else None
+
+    matches = difflib.get_close_matches(query, choices, n=1, cutoff=score_cutoff / 100)
+    return matches[0] if matches else None
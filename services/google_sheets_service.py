@@ -1,11 +1,21 @@
-import gspread
-from google.oauth2.service_account import Credentials
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import json
+import logging
 import os
+import threading
+import time
+import atexit
 from .order_management import Order, OrderStatus
 
+logger = logging.getLogger(__name__)
+
+# Как долго (в секундах) доверять кэшу номеров строк без перечитывания таблицы
+ROW_CACHE_TTL = 30
+
+# Формат денежных колонок (значения пишутся числами)
+CURRENCY_FORMAT = {"numberFormat": {"type": "CURRENCY", "pattern": "$#,##0.00"}}
+
 class GoogleSheetsService:
     def __init__(self):
         self.gc = None
@@ -13,6 +23,22 @@ class GoogleSheetsService:
         self.orders_sheet = None
         self.users_sheet = None
         self.analytics_sheet = None
+        self._worksheets: Dict[str, Any] = {}  # Кэш листов по названию
+        
+        # Буфер заказов, ожидающих записи в таблицу (order_id -> строка)
+        self._pending_orders: Dict[str, List[Any]] = {}
+        # Последняя активность пользователей, ожидающая записи (user_id -> строка)
+        self._pending_users: Dict[int, List[Any]] = {}
+        # Последние данные аналитики за каждый день, ожидающие записи (дата -> строка)
+        self._pending_analytics: Dict[str, List[Any]] = {}
+        self._pending_lock = threading.Lock()
+        
+        # Кэш номеров строк по ключу из колонки A (название листа -> ключ -> строка)
+        # и номер следующей свободной строки каждого листа
+        self._row_cache: Dict[str, Dict[str, int]] = {}
+        self._next_row: Dict[str, int] = {}
+        self._row_cache_loaded_at = 0.0
+        self._row_cache_lock = threading.RLock()
         
         # Настройки Google Sheets
         self.spreadsheet_name = "BuyerChina Orders Tracking"
@@ -26,9 +52,13 @@ class GoogleSheetsService:
         try:
             # Проверяем наличие файла с учетными данными
             if not os.path.exists(self.credentials_file):
-                print(f"Warning: File {self.credentials_file} not found. Google Sheets integration disabled.")
+                logger.warning("File %s not found. Google Sheets integration disabled.", self.credentials_file)
                 return
             
+            # Тяжелые библиотеки Google импортируются только когда интеграция включена
+            import gspread
+            from google.oauth2.service_account import Credentials
+            
             # Настройка области доступа
             scope = [
                 'https://www.googleapis.com/auth/spreadsheets',
@@ -49,11 +79,14 @@ class GoogleSheetsService:
             # Получение листов
             self._get_or_create_sheets()
             
-            print("Google Sheets connected successfully!")
-            print(f"Spreadsheet URL: {self.get_spreadsheet_url()}")
+            logger.info("Google Sheets connected successfully!")
+            
+            # Сохраняем накопленные изменения при завершении процесса
+            atexit.register(self.flush)
+            logger.info("Spreadsheet URL: %s", self.get_spreadsheet_url())
             
         except Exception as e:
-            print(f"Error connecting to Google Sheets: {e}")
+            logger.error("Error connecting to Google Sheets: %s", e)
             self.gc = None
     
     def _setup_sheets(self):
@@ -73,36 +106,43 @@ class GoogleSheetsService:
         if not self.spreadsheet:
             return
         
+        # Один запрос на список всех листов вместо проверки каждого по имени
+        self._worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        
         # Лист заказов
-        try:
-            self.orders_sheet = self.spreadsheet.worksheet("Orders")
-        except gspread.WorksheetNotFound:
-            self.orders_sheet = self.spreadsheet.add_worksheet(title="Orders", rows="1000", cols="15")
+        self.orders_sheet = self._worksheets.get("Orders")
+        if not self.orders_sheet:
+            self.orders_sheet = self._add_worksheet("Orders", rows="1000", cols="15")
             self._setup_orders_headers()
         
         # Лист пользователей
-        try:
-            self.users_sheet = self.spreadsheet.worksheet("Users")
-        except gspread.WorksheetNotFound:
-            self.users_sheet = self.spreadsheet.add_worksheet(title="Users", rows="1000", cols="10")
+        self.users_sheet = self._worksheets.get("Users")
+        if not self.users_sheet:
+            self.users_sheet = self._add_worksheet("Users", rows="1000", cols="10")
             self._setup_users_headers()
         
         # Лист аналитики
-        try:
-            self.analytics_sheet = self.spreadsheet.worksheet("Analytics")
-        except gspread.WorksheetNotFound:
-            self.analytics_sheet = self.spreadsheet.add_worksheet(title="Analytics", rows="100", cols="10")
+        self.analytics_sheet = self._worksheets.get("Analytics")
+        if not self.analytics_sheet:
+            self.analytics_sheet = self._add_worksheet("Analytics", rows="100", cols="10")
             self._setup_analytics_headers()
     
+    def _add_worksheet(self, sheet_name: str, rows: str, cols: str):
+        """Создание листа с запоминанием в кэше листов"""
+        worksheet = self.spreadsheet.add_worksheet(title=sheet_name, rows=rows, cols=cols)
+        self._worksheets[sheet_name] = worksheet
+        return worksheet
+    
     def _get_or_create_sheet(self, sheet_name: str):
         """Получение или создание листа по имени"""
         if not self.spreadsheet:
             return None
         
-        try:
-            return self.spreadsheet.worksheet(sheet_name)
-        except gspread.WorksheetNotFound:
-            return self.spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="15")
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet:
+            return worksheet
+        
+        return self._add_worksheet(sheet_name, rows="1000", cols="15")
     
     def _setup_orders_headers(self):
         """Настройка заголовков для листа заказов"""
@@ -123,6 +163,9 @@ class GoogleSheetsService:
             "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 1.0},
             "textFormat": {"bold": True, "foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}}
         })
+        
+        # Суммы записываются числами - валюта задается форматом колонки
+        self.orders_sheet.format('F2:F', CURRENCY_FORMAT)
     
     def _setup_users_headers(self):
         """Настройка заголовков для листа пользователей"""
@@ -141,6 +184,8 @@ class GoogleSheetsService:
             "backgroundColor": {"red": 0.2, "green": 0.8, "blue": 0.2},
             "textFormat": {"bold": True, "foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}}
         })
+        
+        self.users_sheet.format('I2:I', CURRENCY_FORMAT)
     
     def _setup_analytics_headers(self):
         """Настройка заголовков для листа аналитики"""
@@ -160,60 +205,119 @@ class GoogleSheetsService:
             "backgroundColor": {"red": 1.0, "green": 0.6, "blue": 0.2},
             "textFormat": {"bold": True, "foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}}
         })
+        
+        self.analytics_sheet.format('I2:I', CURRENCY_FORMAT)
     
     def is_connected(self) -> bool:
         """Проверка подключения к Google Sheets"""
         return self.gc is not None and self.spreadsheet is not None
     
     def sync_order(self, order: Order, user_info: Dict = None):
-        """Синхронизация заказа с Google Sheets"""
+        """Постановка заказа в очередь синхронизации (запись выполняет flush_orders)"""
         if not self.is_connected():
-            print(f"Google Sheets not connected, skipping order sync for {order.order_id}")
+            logger.warning("Google Sheets not connected, skipping order sync for %s", order.order_id)
             return False
         
+        order_data = self._prepare_order_data(order, user_info)
+        
+        with self._pending_lock:
+            # Повторная синхронизация того же заказа перезаписывает строку в буфере
+            self._pending_orders[order.order_id] = order_data
+        
+        return True
+    
+    def flush_orders(self) -> bool:
+        """Запись всех накопленных заказов в Google Sheets за минимум запросов"""
+        if not self.is_connected():
+            return False
+        
+        with self._pending_lock:
+            pending = self._pending_orders
+            self._pending_orders = {}
+        
+        if not pending:
+            return True
+        
         try:
-            print(f"Syncing order {order.order_id}...")
-            # Поиск существующей записи
-            existing_row = self._find_order_row(order.order_id)
+            logger.info("Flushing %s orders...", len(pending))
+            order_rows = self._get_row_index(self.orders_sheet)
             
-            # Подготовка данных
-            order_data = self._prepare_order_data(order, user_info)
+            updates = []
+            new_rows = []
+            for order_id, order_data in pending.items():
+                existing_row = order_rows.get(order_id)
+                if existing_row:
+                    updates.append({'range': f'A{existing_row}:O{existing_row}', 'values': [order_data]})
+                else:
+                    new_rows.append(order_data)
             
-            if existing_row:
-                # Обновление существующей записи
-                self.orders_sheet.update(f'A{existing_row}:O{existing_row}', [order_data])
-                print(f"Updated order {order.order_id} in row {existing_row}")
-            else:
-                # Добавление новой записи
-                self.orders_sheet.append_row(order_data)
-                print(f"Added new order {order.order_id}")
+            if updates:
+                self.orders_sheet.batch_update(updates)
+            if new_rows:
+                self.orders_sheet.append_rows(new_rows, value_input_option='RAW')
+                self._remember_appended_rows(self.orders_sheet, [row[0] for row in new_rows])
             
+            logger.info("Flushed orders: %s updated, %s added", len(updates), len(new_rows))
             return True
             
         except Exception as e:
-            print(f"Error syncing order {order.order_id}: {e}")
+            logger.error("Error flushing orders: %s", e)
+            self._invalidate_row_cache(self.orders_sheet)
+            # Возвращаем заказы в буфер, не затирая более свежие данные
+            with self._pending_lock:
+                for order_id, order_data in pending.items():
+                    self._pending_orders.setdefault(order_id, order_data)
             return False
     
-    def _find_order_row(self, order_id: str) -> Optional[int]:
-        """Поиск строки заказа по ID"""
-        if not self.orders_sheet:
-            return None
+    def _get_row_index(self, sheet) -> Dict[str, int]:
+        """Карта ключ -> номер строки для листа (обновляется не чаще раза в ROW_CACHE_TTL)"""
+        with self._row_cache_lock:
+            expired = time.monotonic() - self._row_cache_loaded_at > ROW_CACHE_TTL
+            if expired or sheet.title not in self._row_cache:
+                self._load_row_indexes(sheet)
+            return self._row_cache[sheet.title]
+    
+    def _load_row_indexes(self, sheet):
+        """Чтение колонки A всех листов одним запросом и перестроение карт строк"""
+        sheets = [ws for ws in (self.orders_sheet, self.users_sheet, self.analytics_sheet) if ws]
+        if sheet not in sheets:
+            sheets.append(sheet)
         
-        try:
-            # Получаем все значения в колонке A (Order ID)
-            order_ids = self.orders_sheet.col_values(1)
-            
-            for i, existing_id in enumerate(order_ids[1:], start=2):  # Пропускаем заголовок
-                if existing_id == order_id:
-                    return i
-            
-            return None
-            
-        except Exception as e:
-            print(f"Error finding order: {e}")
-            return None
+        response = self.spreadsheet.values_batch_get(
+            [f"'{ws.title}'!A:A" for ws in sheets],
+            params={'majorDimension': 'COLUMNS'}
+        )
+        
+        for ws, value_range in zip(sheets, response.get('valueRanges', [])):
+            columns = value_range.get('values', [])
+            keys = columns[0] if columns else []
+            index = {}
+            for i, key in enumerate(keys[1:], start=2):  # Пропускаем заголовок
+                index.setdefault(key, i)
+            self._row_cache[ws.title] = index
+            self._next_row[ws.title] = len(keys) + 1
+        
+        self._row_cache_loaded_at = time.monotonic()
     
-    def _prepare_order_data(self, order: Order, user_info: Dict = None) -> List[str]:
+    def _remember_appended_rows(self, sheet, keys: List[str]):
+        """Учет строк, добавленных в конец листа, без повторного чтения колонки A"""
+        with self._row_cache_lock:
+            index = self._get_row_index(sheet)
+            for key in keys:
+                # Если кэш только что перечитан, добавленная строка в нем уже есть
+                if key not in index:
+                    index[key] = self._next_row[sheet.title]
+                    self._next_row[sheet.title] += 1
+    
+    def _invalidate_row_cache(self, sheet):
+        """Сброс кэша строк листа (после ошибки данные могли разойтись)"""
+        if not sheet:
+            return
+        with self._row_cache_lock:
+            self._row_cache.pop(sheet.title, None)
+            self._next_row.pop(sheet.title, None)
+    
+    def _prepare_order_data(self, order: Order, user_info: Dict = None) -> List[Any]:
         """Подготовка данных заказа для Google Sheets"""
         # Подготовка деталей товаров
         items_details = []
@@ -226,137 +330,177 @@ class GoogleSheetsService:
         username = user_info.get('username', '') if user_info else ''
         language = user_info.get('language', 'en') if user_info else 'en'
         
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
         return [
             order.order_id,
-            str(order.user_id),
+            order.user_id,
             username,
             order.status.value,
             order.supplier,
-            f"${order.total_amount:.2f}",
-            order.created_date.strftime('%Y-%m-%d %H:%M:%S'),
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            order.total_amount,
+            order.created_date_str,
+            now_str,
             order.tracking_number or '',
-            str(len(order.items)),
+            len(order.items),
             items_str,
             order.notes,
-            order.estimated_delivery.strftime('%Y-%m-%d'),
+            order.estimated_delivery_str,
             language,
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            now_str
         ]
     
     def sync_user_activity(self, user_id: int, user_info: Dict):
-        """Синхронизация активности пользователя"""
+        """Постановка активности пользователя в очередь синхронизации (запись выполняет flush_users)"""
         if not self.is_connected():
-            print(f"Google Sheets not connected, skipping user sync for {user_id}")
+            logger.warning("Google Sheets not connected, skipping user sync for %s", user_id)
             return False
         
+        user_data = self._prepare_user_data(user_id, user_info)
+        
+        with self._pending_lock:
+            # Сохраняется только последняя активность пользователя
+            self._pending_users[user_id] = user_data
+        
+        return True
+    
+    def flush_users(self) -> bool:
+        """Запись накопленной активности пользователей в Google Sheets за минимум запросов"""
+        if not self.is_connected():
+            return False
+        
+        with self._pending_lock:
+            pending = self._pending_users
+            self._pending_users = {}
+        
+        if not pending:
+            return True
+        
         try:
-            print(f"Syncing user activity for {user_id}...")
-            # Поиск существующей записи пользователя
-            existing_row = self._find_user_row(user_id)
+            logger.info("Flushing %s users...", len(pending))
+            user_rows = self._get_row_index(self.users_sheet)
             
-            # Подготовка данных пользователя
-            user_data = self._prepare_user_data(user_id, user_info)
+            updates = []
+            new_rows = []
+            for user_id, user_data in pending.items():
+                existing_row = user_rows.get(str(user_id))
+                if existing_row:
+                    updates.append({'range': f'A{existing_row}:J{existing_row}', 'values': [user_data]})
+                else:
+                    new_rows.append(user_data)
             
-            if existing_row:
-                # Обновление существующей записи
-                self.users_sheet.update(f'A{existing_row}:J{existing_row}', [user_data])
-                print(f"Updated user {user_id} in row {existing_row}")
-            else:
-                # Добавление новой записи
-                self.users_sheet.append_row(user_data)
-                print(f"Added new user {user_id}")
+            if updates:
+                self.users_sheet.batch_update(updates)
+            if new_rows:
+                self.users_sheet.append_rows(new_rows, value_input_option='RAW')
+                self._remember_appended_rows(self.users_sheet, [str(row[0]) for row in new_rows])
             
+            logger.info("Flushed users: %s updated, %s added", len(updates), len(new_rows))
             return True
             
         except Exception as e:
-            print(f"Error syncing user {user_id}: {e}")
+            logger.error("Error flushing users: %s", e)
+            self._invalidate_row_cache(self.users_sheet)
+            # Возвращаем данные в буфер, не затирая более свежие
+            with self._pending_lock:
+                for user_id, user_data in pending.items():
+                    self._pending_users.setdefault(user_id, user_data)
             return False
     
-    def _find_user_row(self, user_id: int) -> Optional[int]:
-        """Поиск строки пользователя по ID"""
-        if not self.users_sheet:
-            return None
-        
-        try:
-            user_ids = self.users_sheet.col_values(1)
-            
-            for i, existing_id in enumerate(user_ids[1:], start=2):
-                if existing_id == str(user_id):
-                    return i
-            
-            return None
-            
-        except Exception as e:
-            print(f"Error finding user: {e}")
-            return None
-    
-    def _prepare_user_data(self, user_id: int, user_info: Dict) -> List[str]:
+    def _prepare_user_data(self, user_id: int, user_info: Dict) -> List[Any]:
         """Подготовка данных пользователя для Google Sheets"""
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
         return [
-            str(user_id),
+            user_id,
             user_info.get('username', ''),
             user_info.get('first_name', ''),
             user_info.get('last_name', ''),
             user_info.get('language', 'en'),
-            user_info.get('first_interaction', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            str(user_info.get('orders_count', 0)),
-            f"${user_info.get('total_spent', 0):.2f}",
+            user_info.get('first_interaction', now_str),
+            now_str,
+            user_info.get('orders_count', 0),
+            user_info.get('total_spent', 0),
             user_info.get('status', 'active')
         ]
     
     def update_analytics(self, analytics_data: Dict):
-        """Обновление аналитики"""
+        """Обновление аналитики (сохраняется последнее значение за день, запись выполняет flush_analytics)"""
         if not self.is_connected():
             return False
         
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        analytics_row = [
+            today,
+            analytics_data.get('total_orders', 0),
+            analytics_data.get('pending_orders', 0),
+            analytics_data.get('confirmed_orders', 0),
+            analytics_data.get('production_orders', 0),
+            analytics_data.get('shipped_orders', 0),
+            analytics_data.get('delivered_orders', 0),
+            analytics_data.get('cancelled_orders', 0),
+            analytics_data.get('total_revenue', 0),
+            analytics_data.get('active_users', 0)
+        ]
+        
+        with self._pending_lock:
+            # Важна только последняя запись за день - более ранние просто заменяются
+            self._pending_analytics[today] = analytics_row
+        
+        return True
+    
+    def flush_analytics(self) -> bool:
+        """Запись накопленной аналитики в Google Sheets (одна строка на день)"""
+        if not self.is_connected():
+            return False
+        
+        with self._pending_lock:
+            pending = self._pending_analytics
+            self._pending_analytics = {}
+        
+        if not pending:
+            return True
+        
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            # Поиск записи за сегодня
-            existing_row = self._find_analytics_row(today)
-            
-            analytics_row = [
-                today,
-                str(analytics_data.get('total_orders', 0)),
-                str(analytics_data.get('pending_orders', 0)),
-                str(analytics_data.get('confirmed_orders', 0)),
-                str(analytics_data.get('production_orders', 0)),
-                str(analytics_data.get('shipped_orders', 0)),
-                str(analytics_data.get('delivered_orders', 0)),
-                str(analytics_data.get('cancelled_orders', 0)),
-                f"${analytics_data.get('total_revenue', 0):.2f}",
-                str(analytics_data.get('active_users', 0))
-            ]
-            
-            if existing_row:
-                self.analytics_sheet.update(f'A{existing_row}:J{existing_row}', [analytics_row])
-            else:
-                self.analytics_sheet.append_row(analytics_row)
+            for date, analytics_row in pending.items():
+                # Поиск записи за этот день
+                existing_row = self._find_analytics_row(date)
+                
+                if existing_row:
+                    self.analytics_sheet.update(f'A{existing_row}:J{existing_row}', [analytics_row])
+                else:
+                    self.analytics_sheet.append_row(analytics_row)
+                    self._remember_appended_rows(self.analytics_sheet, [date])
             
             return True
             
         except Exception as e:
-            print(f"Error updating analytics: {e}")
+            logger.error("Error updating analytics: %s", e)
+            self._invalidate_row_cache(self.analytics_sheet)
+            # Возвращаем данные в буфер, не затирая более свежие
+            with self._pending_lock:
+                for date, analytics_row in pending.items():
+                    self._pending_analytics.setdefault(date, analytics_row)
             return False
     
+    def flush(self) -> bool:
+        """Запись всех накопленных изменений (заказы, пользователи и аналитика)"""
+        orders_ok = self.flush_orders()
+        users_ok = self.flush_users()
+        analytics_ok = self.flush_analytics()
+        return orders_ok and users_ok and analytics_ok
+    
     def _find_analytics_row(self, date: str) -> Optional[int]:
         """Поиск строки аналитики по дате"""
         if not self.analytics_sheet:
             return None
         
         try:
-            dates = self.analytics_sheet.col_values(1)
-            
-            for i, existing_date in enumerate(dates[1:], start=2):
-                if existing_date == date:
-                    return i
-            
-            return None
+            return self._get_row_index(self.analytics_sheet).get(date)
             
         except Exception as e:
-            print(f"Error finding analytics: {e}")
+            logger.error("Error finding analytics: %s", e)
             return None
     
     def get_spreadsheet_url(self) -> Optional[str]:
@@ -1,5 +1,7 @@
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from operator import attrgetter
+import bisect
 from datetime import datetime, timedelta
 from enum import Enum
 
@@ -12,14 +14,36 @@ class ShipmentStatus(Enum):
     DELIVERED = "delivered"
     EXCEPTION = "exception"
 
-@dataclass
+STATUS_EMOJI: Dict[ShipmentStatus, str] = {
+    ShipmentStatus.PREPARING: "📋",
+    ShipmentStatus.PICKED_UP: "📦",
+    ShipmentStatus.IN_TRANSIT: "🚛",
+    ShipmentStatus.CUSTOMS: "🛃",
+    ShipmentStatus.OUT_FOR_DELIVERY: "🚚",
+    ShipmentStatus.DELIVERED: "✅",
+    ShipmentStatus.EXCEPTION: "⚠️"
+}
+
+# Human-readable status names, e.g. "Out For Delivery"
+STATUS_DISPLAY: Dict[ShipmentStatus, str] = {
+    status: status.value.replace('_', ' ').title() for status in ShipmentStatus
+}
+
+@dataclass(slots=True, frozen=True)
 class TrackingEvent:
     timestamp: datetime
     location: str
     status: ShipmentStatus
     description: str
+    # Timestamps never change, so the display form is formatted once
+    formatted_time: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'formatted_time', self.timestamp.strftime('%m/%d %H:%M'))
+
+_event_time = attrgetter('timestamp')
 
-@dataclass
+@dataclass(slots=True)
 class Shipment:
     tracking_number: str
     carrier: str
@@ -30,10 +54,20 @@ class Shipment:
     estimated_delivery: datetime
     weight: Optional[str] = None
     dimensions: Optional[str] = None
+    
+    def __post_init__(self):
+        # Events are kept in chronological order, so views never need to re-sort them
+        self.events.sort(key=_event_time)
+    
+    def add_event(self, event: TrackingEvent):
+        """Insert an event keeping the event list in chronological order"""
+        bisect.insort(self.events, event, key=_event_time)
 
 class LogisticsTrackingService:
     def __init__(self):
         self.shipments: Dict[str, Shipment] = {}
+        # Undelivered shipments by tracking number (kept in sync by add_shipment/set_status)
+        self._active: Dict[str, Shipment] = {}
         self._create_mock_shipments()
     
     def _create_mock_shipments(self):
@@ -72,7 +106,7 @@ class LogisticsTrackingService:
             dimensions="30x20x15 cm"
         )
         
-        self.shipments["SF1234567890"] = shipment1
+        self.add_shipment(shipment1)
         
         # Mock shipment 2
         events2 = [
@@ -114,27 +148,56 @@ class LogisticsTrackingService:
             dimensions="40x30x25 cm"
         )
         
-        self.shipments["DHL9876543210"] = shipment2
+        self.add_shipment(shipment2)
+    
+    def add_shipment(self, shipment: Shipment):
+        """Register a shipment under its upper-cased tracking number"""
+        key = shipment.tracking_number.upper()
+        self.shipments[key] = shipment
+        if shipment.current_status != ShipmentStatus.DELIVERED:
+            self._active[key] = shipment
+    
+    def set_status(self, tracking_number: str, status: ShipmentStatus) -> bool:
+        """Update shipment status, keeping the active shipments index current"""
+        key = tracking_number.upper()
+        shipment = self.shipments.get(key)
+        if shipment is None:
+            return False
+        
+        shipment.current_status = status
+        if status == ShipmentStatus.DELIVERED:
+            self._active.pop(key, None)
+        else:
+            self._active[key] = shipment
+        return True
     
     def track_shipment(self, tracking_number: str) -> Optional[Shipment]:
         """Track a shipment by tracking number"""
-        return self.shipments.get(tracking_number.upper())
+        # Keys are stored upper-cased, so most lookups need no conversion
+        shipment = self.shipments.get(tracking_number)
+        if shipment is None:
+            shipment = self.shipments.get(tracking_number.upper())
+        return shipment
     
     def format_tracking_info(self, shipment: Shipment, language_service=None, user_id=None) -> str:
         """Format shipment tracking information"""
         status_emoji = self._get_status_emoji(shipment.current_status)
         
         if language_service and user_id:
-            header = language_service.get_text(user_id, 'shipment_tracking')
-            status_label = language_service.get_text(user_id, 'status')
-            carrier_label = language_service.get_text(user_id, 'carrier')
-            origin_label = language_service.get_text(user_id, 'origin')
-            destination_label = language_service.get_text(user_id, 'destination')
-            weight_label = language_service.get_text(user_id, 'weight')
-            dimensions_label = language_service.get_text(user_id, 'dimensions')
-            est_delivery_label = language_service.get_text(user_id, 'est_delivery')
-            tracking_label = language_service.get_text(user_id, 'tracking')
-            history_label = language_service.get_text(user_id, 'tracking_history')
+            labels = language_service.get_texts(user_id, (
+                'shipment_tracking', 'status', 'carrier', 'origin', 'destination',
+                'weight', 'dimensions', 'est_delivery', 'tracking', 'tracking_history'
+            ))
+            header = labels['shipment_tracking']
+            status_label = labels['status']
+            carrier_label = labels['carrier']
+            origin_label = labels['origin']
+            destination_label = labels['destination']
+            weight_label = labels['weight']
+            dimensions_label = labels['dimensions']
+            est_delivery_label = labels['est_delivery']
+            tracking_label = labels['tracking']
+            history_label = labels['tracking_history']
         else:
             header = "📦 **Shipment Tracking**"
             status_label = "Status:"
@@ -147,30 +210,32 @@ class LogisticsTrackingService:
             tracking_label = "Tracking #:"
             history_label = "📍 Tracking History:"
         
-        message = f"{header}\n\n"
-        message += f"**{tracking_label}** {shipment.tracking_number}\n"
-        message += f"**{carrier_label}** {shipment.carrier}\n"
-        message += f"**{status_label}** {shipment.current_status.value.replace('_', ' ').title()} {status_emoji}\n"
-        message += f"**{origin_label}** {shipment.origin}\n"
-        message += f"**{destination_label}** {shipment.destination}\n"
-        message += f"**{est_delivery_label}** {shipment.estimated_delivery.strftime('%Y-%m-%d')}\n"
+        parts = [
+            f"{header}\n\n"
+            f"**{tracking_label}** {shipment.tracking_number}\n"
+            f"**{carrier_label}** {shipment.carrier}\n"
+            f"**{status_label}** {STATUS_DISPLAY[shipment.current_status]} {status_emoji}\n"
+            f"**{origin_label}** {shipment.origin}\n"
+            f"**{destination_label}** {shipment.destination}\n"
+            f"**{est_delivery_label}** {shipment.estimated_delivery.strftime('%Y-%m-%d')}\n"
+        ]
         
         if shipment.weight:
-            message += f"**{weight_label}** {shipment.weight}\n"
+            parts.append(f"**{weight_label}** {shipment.weight}\n")
         if shipment.dimensions:
-            message += f"**{dimensions_label}** {shipment.dimensions}\n"
+            parts.append(f"**{dimensions_label}** {shipment.dimensions}\n")
         
-        message += f"\n**{history_label}**\n"
+        parts.append(f"\n**{history_label}**\n")
         
-        # Sort events by timestamp (newest first)
-        sorted_events = sorted(shipment.events, key=lambda x: x.timestamp, reverse=True)
-        
-        for event in sorted_events:
+        # Events are stored oldest first - show newest first
+        for event in reversed(shipment.events):
             event_emoji = self._get_status_emoji(event.status)
-            message += f"\n{event_emoji} **{event.timestamp.strftime('%m/%d %H:%M')}** - {event.location}\n"
-            message += f"   {event.description}\n"
+            parts.append(
+                f"\n{event_emoji} **{event.formatted_time}** - {event.location}\n"
+                f"   {event.description}\n"
+            )
         
-        return message
+        return "".join(parts)
     
     def get_delivery_estimate(self, tracking_number: str) -> Optional[str]:
         """Get delivery estimate for a shipment"""
@@ -191,20 +256,8 @@ class LogisticsTrackingService:
     
     def _get_status_emoji(self, status: ShipmentStatus) -> str:
         """Get emoji for shipment status"""
-        status_emojis = {
-            ShipmentStatus.PREPARING: "📋",
-            ShipmentStatus.PICKED_UP: "📦",
-            ShipmentStatus.IN_TRANSIT: "🚛",
-            ShipmentStatus.CUSTOMS: "🛃",
-            ShipmentStatus.OUT_FOR_DELIVERY: "🚚",
-            ShipmentStatus.DELIVERED: "✅",
-            ShipmentStatus.EXCEPTION: "⚠️"
-        }
-        return status_emojis.get(status, "❓")
+        return STATUS_EMOJI.get(status, "❓")
     
     def get_all_active_shipments(self) -> List[Shipment]:
         """Get all shipments that are not yet delivered"""
-        return [
-            shipment for shipment in self.shipments.values()
-            if shipment.current_status != ShipmentStatus.DELIVERED
-        ]
+        return list(self._active.values())
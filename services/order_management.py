@@ -1,7 +1,10 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter, defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+import math
+import threading
 
 class OrderStatus(Enum):
     PENDING = "pending"
@@ -11,14 +14,27 @@ class OrderStatus(Enum):
     DELIVERED = "delivered"
     CANCELLED = "cancelled"
 
-@dataclass
+STATUS_EMOJI: Dict[OrderStatus, str] = {
+    OrderStatus.PENDING: "⏳",
+    OrderStatus.CONFIRMED: "✅",
+    OrderStatus.PRODUCTION: "🏭",
+    OrderStatus.SHIPPED: "🚚",
+    OrderStatus.DELIVERED: "📦",
+    OrderStatus.CANCELLED: "❌"
+}
+
+@dataclass(slots=True, frozen=True)
 class OrderItem:
     product_name: str
     quantity: int
     unit_price: float
-    total_price: float
+    
+    @property
+    def total_price(self) -> float:
+        """Line total, always derived from quantity and unit price"""
+        return round(self.quantity * self.unit_price, 2)
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     order_id: str
     user_id: int
@@ -30,11 +46,28 @@ class Order:
     total_amount: float
     tracking_number: Optional[str] = None
     notes: str = ""
+    # Dates are fixed at creation, so their string forms are formatted once
+    # (shorter forms are prefixes of created_date_str)
+    created_date_str: str = field(init=False, repr=False, compare=False)
+    estimated_delivery_str: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.created_date_str = self.created_date.strftime('%Y-%m-%d %H:%M:%S')
+        self.estimated_delivery_str = self.estimated_delivery.strftime('%Y-%m-%d')
 
 class OrderManagementService:
     def __init__(self):
         self.orders: Dict[str, Order] = {}
-        self.user_orders: Dict[int, List[str]] = {}
+        self.user_orders: Dict[int, List[Order]] = defaultdict(list)
+        self.orders_by_status: Dict[OrderStatus, List[str]] = defaultdict(list)
+        
+        # Агрегаты для панели администратора, обновляются при изменениях
+        self._status_counts: Counter = Counter()
+        self._total_amount: float = 0.0
+        
+        # Порядковые номера заказов по дням для генерации order_id
+        self._day_counter: Dict[str, int] = {}
+        self._lock = threading.Lock()
         
         # Mock orders for demonstration
         self._create_mock_orders()
@@ -45,8 +78,8 @@ class OrderManagementService:
             order_id="ORD-2024-001",
             user_id=123456789,  # Replace with actual user ID
             items=[
-                OrderItem("Wireless Bluetooth Headphones", 500, 10.50, 5250.00),
-                OrderItem("USB-C Cable 1m", 1000, 1.00, 1000.00)
+                OrderItem("Wireless Bluetooth Headphones", 500, 10.50),
+                OrderItem("USB-C Cable 1m", 1000, 1.00)
             ],
             supplier="Shenzhen Audio Tech Co.",
             status=OrderStatus.PRODUCTION,
@@ -57,15 +90,25 @@ class OrderManagementService:
             notes="Rush order for electronics store"
         )
         
-        self.orders[mock_order.order_id] = mock_order
-        if mock_order.user_id not in self.user_orders:
-            self.user_orders[mock_order.user_id] = []
-        self.user_orders[mock_order.user_id].append(mock_order.order_id)
+        self._register_order(mock_order)
+    
+    def _register_order(self, order: Order):
+        """Add an order to the indexes and running aggregates"""
+        self.orders[order.order_id] = order
+        
+        self.user_orders[order.user_id].append(order)
+        self.orders_by_status[order.status].append(order.order_id)
+        
+        self._status_counts[order.status] += 1
+        self._total_amount += order.total_amount
     
     def create_order(self, user_id: int, items: List[OrderItem], supplier: str, notes: str = "", google_sheets_service=None) -> Order:
         """Create a new order"""
-        order_id = f"ORD-{datetime.now().strftime('%Y%m%d')}-{len(self.orders) + 1:03d}"
-        total_amount = sum(item.total_price for item in items)
+        day = datetime.now().strftime('%Y%m%d')
+        with self._lock:
+            n = self._day_counter[day] = self._day_counter.get(day, 0) + 1
+        order_id = f"ORD-{day}-{n:03d}"
+        total_amount = math.fsum(item.total_price for item in items)
         
         order = Order(
             order_id=order_id,
@@ -79,11 +122,7 @@ class OrderManagementService:
             notes=notes
         )
         
-        self.orders[order_id] = order
-        
-        if user_id not in self.user_orders:
-            self.user_orders[user_id] = []
-        self.user_orders[user_id].append(order_id)
+        self._register_order(order)
         
         # Синхронизация с Google Sheets
         if google_sheets_service and google_sheets_service.is_connected():
@@ -91,22 +130,46 @@ class OrderManagementService:
         
         return order_id
     
-    def get_user_orders(self, user_id: int) -> List[Order]:
-        """Get all orders for a specific user"""
-        if user_id not in self.user_orders:
-            return []
-        
-        return [self.orders[order_id] for order_id in self.user_orders[user_id]]
+    def get_user_orders(self, user_id: int) -> Sequence[Order]:
+        """Get all orders for a specific user (read-only view, do not modify)"""
+        return self.user_orders.get(user_id, ())
     
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get a specific order by ID"""
         return self.orders.get(order_id)
     
+    def iter_orders(self):
+        """Iterate over all orders without going through the per-user index"""
+        return self.orders.values()
+    
+    def iter_orders_since(self, since: datetime) -> Iterator[Order]:
+        """Iterate over orders created at or after since, newest first"""
+        # Orders are registered in creation order, so the scan stops at the first older one
+        for order in reversed(self.orders.values()):
+            if order.created_date < since:
+                break
+            yield order
+    
+    def get_order_ids_by_status(self, status: OrderStatus) -> List[str]:
+        """Get IDs of all orders currently in the given status"""
+        return self.orders_by_status.get(status, [])
+    
+    def get_dashboard_stats(self) -> Tuple[Counter, float, int]:
+        """Get order counts per status, total amount and total number of orders"""
+        return Counter(self._status_counts), self._total_amount, len(self.orders)
+    
     def update_order_status(self, order_id: str, status: OrderStatus, google_sheets_service=None, tracking_number: str = None) -> bool:
         """Update order status"""
         if order_id not in self.orders:
             return False
         
+        old_status = self.orders[order_id].status
+        if old_status != status:
+            self._status_counts[old_status] -= 1
+            self._status_counts[status] += 1
+            self.orders_by_status[old_status].remove(order_id)
+            self.orders_by_status[status].append(order_id)
+        
         self.orders[order_id].status = status
         if tracking_number:
             self.orders[order_id].tracking_number = tracking_number
@@ -126,11 +189,14 @@ class OrderManagementService:
         
         if language_service and user_id:
             header = language_service.get_text(user_id, 'your_orders', count=len(orders))
-            supplier_label = language_service.get_text(user_id, 'supplier')
-            total_label = language_service.get_text(user_id, 'total')
-            created_label = language_service.get_text(user_id, 'created')
-            tracking_label = language_service.get_text(user_id, 'tracking')
-            est_delivery_label = language_service.get_text(user_id, 'est_delivery')
+            labels = language_service.get_texts(user_id, (
+                'supplier', 'total', 'created', 'tracking', 'est_delivery'
+            ))
+            supplier_label = labels['supplier']
+            total_label = labels['total']
+            created_label = labels['created']
+            tracking_label = labels['tracking']
+            est_delivery_label = labels['est_delivery']
         else:
             header = f"📦 **Your Orders ({len(orders)} total)**"
             supplier_label = "Supplier:"
@@ -139,56 +205,49 @@ class OrderManagementService:
             tracking_label = "Tracking:"
             est_delivery_label = "Est. Delivery:"
         
-        message = f"{header}\n\n"
-        
-        for order in orders[-5:]:  # Show last 5 orders
-            status_emoji = self._get_status_emoji(order.status)
-            message += f"**{order.order_id}** {status_emoji}\n"
-            message += f"🏭 {supplier_label} {order.supplier}\n"
-            message += f"💰 {total_label} ${order.total_amount:,.2f}\n"
-            message += f"📅 {created_label} {order.created_date.strftime('%Y-%m-%d')}\n"
-            
-            if order.tracking_number:
-                message += f"📦 {tracking_label} {order.tracking_number}\n"
-            
-            message += f"🚚 {est_delivery_label} {order.estimated_delivery.strftime('%Y-%m-%d')}\n\n"
-        
-        return message
+        def order_block(order: Order) -> str:
+            tracking_line = f"📦 {tracking_label} {order.tracking_number}\n" if order.tracking_number else ""
+            return (
+                f"**{order.order_id}** {STATUS_EMOJI.get(order.status, '❓')}\n"
+                f"🏭 {supplier_label} {order.supplier}\n"
+                f"💰 {total_label} ${order.total_amount:,.2f}\n"
+                f"📅 {created_label} {order.created_date_str[:10]}\n"
+                f"{tracking_line}"
+                f"🚚 {est_delivery_label} {order.estimated_delivery_str}\n\n"
+            )
+        
+        # Show last 5 orders
+        return f"{header}\n\n" + "".join([order_block(order) for order in orders[-5:]])
     
     def format_order_details(self, order: Order) -> str:
         """Format detailed order information"""
         status_emoji = self._get_status_emoji(order.status)
+        tracking_line = f"**Tracking:** {order.tracking_number}\n" if order.tracking_number else ""
+        
+        parts = [
+            f"📋 **Order Details**\n\n"
+            f"**Order ID:** {order.order_id}\n"
+            f"**Status:** {order.status.value.title()} {status_emoji}\n"
+            f"**Supplier:** {order.supplier}\n"
+            f"**Created:** {order.created_date_str[:16]}\n"
+            f"**Est. Delivery:** {order.estimated_delivery_str}\n"
+            f"{tracking_line}"
+            f"\n**Items:**\n"
+        ]
         
-        message = f"📋 **Order Details**\n\n"
-        message += f"**Order ID:** {order.order_id}\n"
-        message += f"**Status:** {order.status.value.title()} {status_emoji}\n"
-        message += f"**Supplier:** {order.supplier}\n"
-        message += f"**Created:** {order.created_date.strftime('%Y-%m-%d %H:%M')}\n"
-        message += f"**Est. Delivery:** {order.estimated_delivery.strftime('%Y-%m-%d')}\n"
-        
-        if order.tracking_number:
-            message += f"**Tracking:** {order.tracking_number}\n"
-        
-        message += f"\n**Items:**\n"
         for item in order.items:
-            message += f"• {item.product_name}\n"
-            message += f"  Qty: {item.quantity} × ${item.unit_price:.2f} = ${item.total_price:.2f}\n"
+            parts.append(
+                f"• {item.product_name}\n"
+                f"  Qty: {item.quantity} × ${item.unit_price:.2f} = ${item.total_price:.2f}\n"
+            )
         
-        message += f"\n**Total Amount:** ${order.total_amount:,.2f}\n"
+        parts.append(f"\n**Total Amount:** ${order.total_amount:,.2f}\n")
         
         if order.notes:
-            message += f"\n**Notes:** {order.notes}\n"
+            parts.append(f"\n**Notes:** {order.notes}\n")
         
-        return message
+        return "".join(parts)
     
     def _get_status_emoji(self, status: OrderStatus) -> str:
         """Get emoji for order status"""
-        status_emojis = {
-            OrderStatus.PENDING: "⏳",
-            OrderStatus.CONFIRMED: "✅",
-            OrderStatus.PRODUCTION: "🏭",
-            OrderStatus.SHIPPED: "🚚",
-            OrderStatus.DELIVERED: "📦",
-            OrderStatus.CANCELLED: "❌"
-        }
-        return status_emojis.get(status, "❓")
+        return STATUS_EMOJI.get(status, "❓")
@@ -5,14 +5,100 @@ Product Request Service
 Сервис для обработки запросов на поиск товаров через менеджера
 """
 
+import logging
 import os
-import uuid
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+from dataclasses import dataclass, fields
 from services.google_sheets_service import GoogleSheetsService
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+# Лист и заголовки для запросов товаров
+REQUESTS_SHEET = "Product Requests"
+REQUEST_HEADERS = [
+    "Request ID", "User ID", "Username", "Request Type", "Description", 
+    "Image URL", "Status", "Created Date", "Manager Response", 
+    "Estimated Price", "Supplier Info", "Response Date"
+]
+
+# Файл базы данных запросов (переживает перезапуск бота)
+REQUESTS_DB_PATH = os.getenv('PRODUCT_REQUESTS_DB', 'product_requests.db')
+
+# Сколько последних запросов держать в памяти для быстрого доступа
+REQUESTS_CACHE_SIZE = 256
+
+REQUESTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    request_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    username TEXT,
+    request_type TEXT,
+    description TEXT,
+    image_url TEXT,
+    status TEXT,
+    created_date TEXT,
+    manager_response TEXT,
+    estimated_price TEXT,
+    supplier_info TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requests_user ON requests(user_id, created_date);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
+"""
+
+# Эмодзи статусов запросов
+STATUS_EMOJI: Dict[str, str] = {
+    'pending': '🕐',
+    'processing': '⚙️',
+    'completed': '✅',
+    'cancelled': '❌'
+}
+
+# Тексты сообщений о запросах по языкам
+_TEMPLATES: Dict[str, Dict[str, str]] = {
+    'en': {
+        'confirm_header': "✅ **Product Search Request Submitted**",
+        'request_id': "Request ID:",
+        'request_type': "Request Type:",
+        'description': "Description:",
+        'status': "Status:",
+        'image_attached': "🖼️ **Image:** Attached\n",
+        'manager_note': (
+            "📋 **Your request has been sent to our manager**\n\n"
+            "🕐 Our manager will process your request and provide:\n"
+            "• Suitable products with prices\n"
+            "• Supplier information\n"
+            "• Order and shipping terms\n\n"
+            "⏱️ Response usually comes within 1-2 hours during business hours."
+        ),
+        'no_requests': "📋 You don't have any product search requests yet.",
+        'requests_header': "📋 **Your Product Search Requests** ({count})",
+    },
+    'ru': {
+        'confirm_header': "✅ **Запрос на поиск товара отправлен**",
+        'request_id': "ID запроса:",
+        'request_type': "Тип запроса:",
+        'description': "Описание:",
+        'status': "Статус:",
+        'image_attached': "🖼️ **Изображение:** Прикреплено\n",
+        'manager_note': (
+            "📋 **Ваш запрос передан менеджеру**\n\n"
+            "🕐 Менеджер обработает ваш запрос и предоставит:\n"
+            "• Подходящие товары с ценами\n"
+            "• Информацию о поставщиках\n"
+            "• Условия заказа и доставки\n\n"
+            "⏱️ Обычно ответ приходит в течение 1-2 часов в рабочее время."
+        ),
+        'no_requests': "📋 У вас пока нет запросов на поиск товаров.",
+        'requests_header': "📋 **Ваши запросы на поиск товаров** ({count})",
+    },
+}
+
+@dataclass(slots=True)
 class ProductRequest:
     request_id: str
     user_id: int
@@ -30,15 +116,29 @@ class ProductRequest:
         if self.created_date is None:
             self.created_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
+# Колонки таблицы requests в порядке полей ProductRequest
+REQUEST_COLUMNS = ", ".join(f.name for f in fields(ProductRequest))
+
 class ProductRequestService:
-    def __init__(self, google_sheets_service: GoogleSheetsService = None):
+    def __init__(self, google_sheets_service: GoogleSheetsService = None, db_path: str = REQUESTS_DB_PATH):
         self.google_sheets_service = google_sheets_service
-        self.pending_requests = {}  # Локальное хранение для быстрого доступа
+        # Последние запросы в памяти для быстрого доступа (request_id -> запрос)
+        self.pending_requests: "OrderedDict[str, ProductRequest]" = OrderedDict()
+        
+        # Все запросы хранятся в SQLite с индексами по пользователю и статусу
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(REQUESTS_SCHEMA)
+        self._db_lock = threading.Lock()
+        
+        # Строки запросов, ожидающие записи в Google Sheets
+        self._pending_rows: List[List[str]] = []
+        self._pending_lock = threading.Lock()
+        self._headers_checked = False
         
     def create_product_request(self, user_id: int, username: str, description: str, 
                              image_url: Optional[str] = None) -> ProductRequest:
         """Создать новый запрос на поиск товара"""
-        request_id = str(uuid.uuid4())[:8]  # Короткий ID для удобства
+        request_id = secrets.token_hex(4)  # Короткий ID для удобства (8 hex символов)
         
         request_type = 'image' if image_url else 'text'
         
@@ -51,159 +151,149 @@ class ProductRequestService:
             image_url=image_url
         )
         
-        # Сохраняем локально
-        self.pending_requests[request_id] = request
+        # Сохраняем в базу и в кэш
+        placeholders = ", ".join("?" * len(fields(ProductRequest)))
+        with self._db_lock, self._db:
+            self._db.execute(
+                f"INSERT INTO requests ({REQUEST_COLUMNS}) VALUES ({placeholders})",
+                [getattr(request, f.name) for f in fields(ProductRequest)]
+            )
+        self._cache_request(request)
         
-        # Отправляем в Google Sheets
+        # Ставим в очередь записи в Google Sheets
         if self.google_sheets_service and self.google_sheets_service.is_connected():
             self._sync_request_to_sheets(request)
         
         return request
     
     def _sync_request_to_sheets(self, request: ProductRequest):
-        """Синхронизировать запрос с Google Sheets"""
+        """Поставить запрос в очередь записи в Google Sheets (запись выполняет flush)"""
+        row_data = [
+            request.request_id,
+            str(request.user_id),
+            request.username,
+            request.request_type,
+            request.description,
+            request.image_url or '',
+            request.status,
+            request.created_date,
+            request.manager_response or '',
+            request.estimated_price or '',
+            request.supplier_info or '',
+            ''  # Response Date - заполнится при ответе менеджера
+        ]
+        
+        with self._pending_lock:
+            self._pending_rows.append(row_data)
+    
+    def flush(self) -> bool:
+        """Записать накопленные запросы в Google Sheets одним запросом"""
+        if not (self.google_sheets_service and self.google_sheets_service.is_connected()):
+            return False
+        
+        with self._pending_lock:
+            rows = self._pending_rows
+            self._pending_rows = []
+        
+        if not rows:
+            return True
+        
         try:
             # Получаем или создаем лист для запросов товаров
-            sheet = self.google_sheets_service._get_or_create_sheet("Product Requests")
-            
-            # Заголовки для листа запросов
-            headers = [
-                "Request ID", "User ID", "Username", "Request Type", "Description", 
-                "Image URL", "Status", "Created Date", "Manager Response", 
-                "Estimated Price", "Supplier Info", "Response Date"
-            ]
+            sheet = self.google_sheets_service._get_or_create_sheet(REQUESTS_SHEET)
             
-            # Проверяем и устанавливаем заголовки
-            if not sheet.row_values(1):
-                sheet.update('A1:L1', [headers])
+            # Заголовки проверяются один раз за время работы
+            if not self._headers_checked:
+                if not sheet.row_values(1):
+                    sheet.update('A1:L1', [REQUEST_HEADERS])
+                self._headers_checked = True
             
-            # Добавляем новый запрос
-            row_data = [
-                request.request_id,
-                str(request.user_id),
-                request.username,
-                request.request_type,
-                request.description,
-                request.image_url or '',
-                request.status,
-                request.created_date,
-                request.manager_response or '',
-                request.estimated_price or '',
-                request.supplier_info or '',
-                ''  # Response Date - заполнится при ответе менеджера
-            ]
+            # Следующую свободную строку определяет сервер (values.append) - таблицу читать не нужно.
+            # INSERT_ROWS вставляет новые строки, не перезаписывая данные под таблицей
+            sheet.append_rows(rows, value_input_option='RAW', insert_data_option='INSERT_ROWS')
             
-            # Находим следующую пустую строку
-            all_values = sheet.get_all_values()
-            next_row = len(all_values) + 1
-            
-            # Добавляем данные
-            range_name = f'A{next_row}:L{next_row}'
-            sheet.update(range_name, [row_data])
-            
-            print(f"Request {request.request_id} added to Google Sheets")
+            logger.info("%s requests added to Google Sheets", len(rows))
+            return True
             
         except Exception as e:
-            print(f"Error syncing request to Google Sheets: {e}")
+            logger.error("Error syncing requests to Google Sheets: %s", e)
+            # Возвращаем запросы в начало очереди, сохраняя порядок
+            with self._pending_lock:
+                self._pending_rows[:0] = rows
+            return False
+    
+    def _cache_request(self, request: ProductRequest):
+        """Положить запрос в кэш последних запросов"""
+        self.pending_requests[request.request_id] = request
+        self.pending_requests.move_to_end(request.request_id)
+        if len(self.pending_requests) > REQUESTS_CACHE_SIZE:
+            self.pending_requests.popitem(last=False)
+    
+    def _query_requests(self, where: str, params: tuple) -> List[ProductRequest]:
+        """Выбрать запросы из базы (новые первыми)"""
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT {REQUEST_COLUMNS} FROM requests WHERE {where} "
+                "ORDER BY created_date DESC, rowid DESC",
+                params
+            ).fetchall()
+        return [ProductRequest(*row) for row in rows]
     
     def get_user_requests(self, user_id: int) -> list:
-        """Получить все запросы пользователя"""
-        user_requests = []
-        for request in self.pending_requests.values():
-            if request.user_id == user_id:
-                user_requests.append(request)
-        
-        return sorted(user_requests, key=lambda x: x.created_date, reverse=True)
+        """Получить все запросы пользователя (новые первыми)"""
+        return self._query_requests("user_id = ?", (user_id,))
+    
+    def get_requests_by_status(self, status: str) -> list:
+        """Получить запросы с заданным статусом (новые первыми)"""
+        return self._query_requests("status = ?", (status,))
     
     def get_request_status(self, request_id: str) -> Optional[ProductRequest]:
         """Получить статус запроса"""
-        return self.pending_requests.get(request_id)
+        request = self.pending_requests.get(request_id)
+        if request is None:
+            found = self._query_requests("request_id = ?", (request_id,))
+            if found:
+                request = found[0]
+                self._cache_request(request)
+        return request
     
     def format_request_confirmation(self, request: ProductRequest, language_service=None, user_id=None) -> str:
         """Форматировать подтверждение запроса"""
-        if language_service and user_id:
-            lang = language_service.get_user_language(user_id)
-            if lang == 'ru':
-                header = "✅ **Запрос на поиск товара отправлен**"
-                request_id_label = "ID запроса:"
-                type_label = "Тип запроса:"
-                description_label = "Описание:"
-                status_label = "Статус:"
-                manager_note = "📋 **Ваш запрос передан менеджеру**\n\n" \
-                              "🕐 Менеджер обработает ваш запрос и предоставит:\n" \
-                              "• Подходящие товары с ценами\n" \
-                              "• Информацию о поставщиках\n" \
-                              "• Условия заказа и доставки\n\n" \
-                              "⏱️ Обычно ответ приходит в течение 1-2 часов в рабочее время."
-            else:
-                header = "✅ **Product Search Request Submitted**"
-                request_id_label = "Request ID:"
-                type_label = "Request Type:"
-                description_label = "Description:"
-                status_label = "Status:"
-                manager_note = "📋 **Your request has been sent to our manager**\n\n" \
-                              "🕐 Our manager will process your request and provide:\n" \
-                              "• Suitable products with prices\n" \
-                              "• Supplier information\n" \
-                              "• Order and shipping terms\n\n" \
-                              "⏱️ Response usually comes within 1-2 hours during business hours."
-        else:
-            header = "✅ **Product Search Request Submitted**"
-            request_id_label = "Request ID:"
-            type_label = "Request Type:"
-            description_label = "Description:"
-            status_label = "Status:"
-            manager_note = "📋 **Your request has been sent to our manager**\n\n" \
-                          "🕐 Our manager will process your request and provide:\n" \
-                          "• Suitable products with prices\n" \
-                          "• Supplier information\n" \
-                          "• Order and shipping terms\n\n" \
-                          "⏱️ Response usually comes within 1-2 hours during business hours."
-        
-        message = f"{header}\n\n"
-        message += f"🆔 **{request_id_label}** `{request.request_id}`\n"
-        message += f"📝 **{type_label}** {request.request_type.title()}\n"
-        message += f"📋 **{description_label}** {request.description}\n"
-        
-        if request.image_url:
-            message += f"🖼️ **Изображение:** Прикреплено\n"
-        
-        message += f"📊 **{status_label}** {request.status.title()}\n\n"
-        message += manager_note
-        
-        return message
+        t = self._resolve_locale(language_service, user_id)
+        image_line = t['image_attached'] if request.image_url else ""
+        
+        return (
+            f"{t['confirm_header']}\n\n"
+            f"🆔 **{t['request_id']}** `{request.request_id}`\n"
+            f"📝 **{t['request_type']}** {request.request_type.title()}\n"
+            f"📋 **{t['description']}** {request.description}\n"
+            f"{image_line}"
+            f"📊 **{t['status']}** {request.status.title()}\n\n"
+            f"{t['manager_note']}"
+        )
     
     def format_user_requests(self, requests: list, language_service=None, user_id=None) -> str:
         """Форматировать список запросов пользователя"""
+        t = self._resolve_locale(language_service, user_id)
+        
         if not requests:
-            if language_service and user_id:
-                lang = language_service.get_user_language(user_id)
-                if lang == 'ru':
-                    return "📋 У вас пока нет запросов на поиск товаров."
-                else:
-                    return "📋 You don't have any product search requests yet."
-            return "📋 You don't have any product search requests yet."
+            return t['no_requests']
+        
+        parts = [t['requests_header'].format(count=len(requests)), "\n\n"]
         
+        for request in requests[:10]:  # Показываем последние 10
+            status_emoji = STATUS_EMOJI.get(request.status, '❓')
+            parts.append(
+                f"{status_emoji} **{request.request_id}** - {request.description[:50]}...\n"
+                f"   📅 {request.created_date} | 📊 {request.status.title()}\n\n"
+            )
+        
+        return "".join(parts)
+    
+    @staticmethod
+    def _resolve_locale(language_service=None, user_id=None) -> Dict[str, str]:
+        """Тексты сообщений о запросах на языке пользователя (английский по умолчанию)"""
         if language_service and user_id:
             lang = language_service.get_user_language(user_id)
-            if lang == 'ru':
-                header = f"📋 **Ваши запросы на поиск товаров** ({len(requests)})"
-            else:
-                header = f"📋 **Your Product Search Requests** ({len(requests)})"
-        else:
-            header = f"📋 **Your Product Search Requests** ({len(requests)})"
-        
-        message = f"{header}\n\n"
-        
-        for i, request in enumerate(requests[:10], 1):  # Показываем последние 10
-            status_emoji = {
-                'pending': '🕐',
-                'processing': '⚙️',
-                'completed': '✅',
-                'cancelled': '❌'
-            }.get(request.status, '❓')
-            
-            message += f"{status_emoji} **{request.request_id}** - {request.description[:50]}...\n"
-            message += f"   📅 {request.created_date} | 📊 {request.status.title()}\n\n"
-        
-        return message
+            return _TEMPLATES.get(lang, _TEMPLATES['en'])
+        return _TEMPLATES['en']
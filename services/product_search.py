@@ -1,13 +1,50 @@
-import requests
+import asyncio
 import json
+import logging
+import sys
+import time
 import httpx
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
-from bs4 import BeautifulSoup
+from functools import cached_property
+from bs4 import BeautifulSoup, SoupStrainer
 import os
 from urllib.parse import quote
+from .fuzzy_match import best_match
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+# Максимальное количество товаров в результатах поиска
+MAX_SEARCH_RESULTS = 10
+
+# Время жизни результатов поиска в кэше (секунды) и максимальное число запросов в кэше
+SEARCH_CACHE_TTL = 600
+SEARCH_CACHE_SIZE = 1024
+
+# Повторяющиеся во всех результатах значения полей Product - один объект строки на всех
+_PLATFORM_ALIBABA = sys.intern("Alibaba.com")
+_PLATFORM_1688 = sys.intern("1688.com")
+_PLATFORM_MADE_IN_CHINA = sys.intern("Made-in-China.com")
+_LOCATION_CHINA = sys.intern("China")
+_MIN_ORDER_CONTACT = sys.intern("Contact supplier")
+
+def _intern(value):
+    """Интернировать строковое значение из ответа API (прочие типы без изменений)"""
+    return sys.intern(value) if type(value) is str else value
+
+try:
+    import lxml  # noqa: F401 - C парсер заметно быстрее html.parser
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+try:
+    # CSS-выборка на C без создания Python-объекта на каждый узел; без неё используется bs4
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+@dataclass(slots=True, frozen=True)
 class Product:
     name: str
     price: str
@@ -20,6 +57,9 @@ class Product:
     product_url: Optional[str] = None
 
 class ProductSearchService:
+    # Из страницы поиска Made-in-China разбираются только карточки товаров
+    MADE_IN_CHINA_STRAINER = SoupStrainer('div', class_='item-main')
+    
     def __init__(self):
         # API ключи из переменных окружения
         self.alibaba_api_key = os.getenv('ALIBABA_API_KEY')
@@ -30,7 +70,24 @@ class ProductSearchService:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        self.mock_products = [
+        # Общий HTTP клиент: соединения к площадкам переиспользуются между запросами,
+        # неудачные подключения повторяются транспортом
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=10,
+            transport=httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+            )
+        )
+        
+        # Кэш результатов поиска: нормализованный запрос -> (время истечения, товары)
+        self._search_cache: Dict[str, Tuple[float, List[Product]]] = {}
+    
+    @cached_property
+    def mock_products(self) -> List[Product]:
+        """Mock товары, создаются при первом обращении"""
+        return [
             Product(
                 name="Wireless Bluetooth Headphones",
                 price="$8.50 - $12.00",
@@ -73,47 +130,89 @@ class ProductSearchService:
             )
         ]
     
-    def search_products(self, query: str) -> List[Product]:
+    @cached_property
+    def _mock_search_text(self) -> List[Tuple[Product, str, str]]:
+        """Строки mock товаров в нижнем регистре считаются один раз, а не при каждом поиске"""
+        return [
+            (product, product.name.lower(), (product.description or "").lower())
+            for product in self.mock_products
+        ]
+    
+    @cached_property
+    def _mock_by_name(self) -> Dict[str, Product]:
+        """Mock товары по названию в нижнем регистре (первый товар с таким названием)"""
+        by_name: Dict[str, Product] = {}
+        for product in self.mock_products:
+            by_name.setdefault(product.name.lower(), product)
+        return by_name
+    
+    async def search_products(self, query: str) -> List[Product]:
         """Search for products across multiple platforms"""
+        cache_key = query.strip().lower()
+        cached = self._search_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return list(cached[1])
+        
+        results = await self._search_platforms(query)
+        
+        if not results:
+            # Запасные mock данные не кэшируются: временный сбой площадок не закрепляется на весь TTL
+            return self._search_mock(query)
+        
+        if len(self._search_cache) >= SEARCH_CACHE_SIZE:
+            # Удаляем самую старую запись
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[cache_key] = (time.monotonic() + SEARCH_CACHE_TTL, results)
+        
+        return list(results)
+    
+    async def _search_platforms(self, query: str) -> List[Product]:
+        """Поиск на площадках (Alibaba.com, 1688.com, Made-in-China.com)"""
         all_results = []
         
-        # Поиск на всех платформах
-        try:
-            # 1. Alibaba.com
-            alibaba_results = self._search_alibaba(query)
-            all_results.extend(alibaba_results)
-            
-            # 2. 1688.com
-            api_1688_results = self._search_1688(query)
-            all_results.extend(api_1688_results)
-            
-            # 3. Made-in-China.com
-            made_in_china_results = self._search_made_in_china(query)
-            all_results.extend(made_in_china_results)
-            
-        except Exception as e:
-            print(f"Error searching platforms: {e}")
+        # Поиск на всех платформах одновременно
+        platform_results = await asyncio.gather(
+            self._search_alibaba(query),
+            self._search_1688(query),
+            self._search_made_in_china(query),
+            return_exceptions=True
+        )
         
-        # Если нет результатов с реальных площадок, используем mock данные
-        if not all_results:
-            query_lower = query.lower()
-            for product in self.mock_products:
-                if (query_lower in product.name.lower() or 
-                    query_lower in product.description.lower()):
-                    all_results.append(product)
-            
-            # Если и mock данные не подходят, возвращаем первые 3
-            if not all_results:
-                all_results = self.mock_products[:3]
+        for results in platform_results:
+            if isinstance(results, Exception):
+                logger.error("Error searching platforms: %s", results)
+            else:
+                all_results.extend(results)
+        
+        return all_results[:MAX_SEARCH_RESULTS]
+    
+    def _search_mock(self, query: str) -> List[Product]:
+        """Запасной поиск по mock данным, если реальные площадки ничего не вернули"""
+        results = []
+        query_lower = query.lower()
+        for product, name_lower, description_lower in self._mock_search_text:
+            if query_lower in name_lower or query_lower in description_lower:
+                results.append(product)
+                if len(results) >= MAX_SEARCH_RESULTS:
+                    break
         
-        return all_results[:10]  # Возвращаем до 10 результатов
+        # Если и mock данные не подходят, возвращаем первые 3
+        return results or self.mock_products[:3]
+    
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        await self._client.aclose()
     
     def get_product_details(self, product_name: str) -> Optional[Product]:
         """Get detailed information about a specific product"""
-        for product in self.mock_products:
-            if product.name.lower() == product_name.lower():
-                return product
-        return None
+        name_key = product_name.lower()
+        product = self._mock_by_name.get(name_key)
+        if product is None:
+            # Нечёткое совпадение на случай опечаток в названии
+            match = best_match(name_key, self._mock_by_name.keys())
+            if match is not None:
+                product = self._mock_by_name[match]
+        return product
     
     def format_product_message(self, products: List[Product], language_service=None, user_id=None) -> str:
         """Format products into a readable message"""
@@ -124,11 +223,14 @@ class ProductSearchService:
         
         if language_service and user_id:
             header = language_service.get_text(user_id, 'products_found', count=len(products))
-            price_label = language_service.get_text(user_id, 'price')
-            supplier_label = language_service.get_text(user_id, 'supplier')
-            min_order_label = language_service.get_text(user_id, 'min_order')
-            location_label = language_service.get_text(user_id, 'location')
-            contact_msg = language_service.get_text(user_id, 'contact_quote')
+            labels = language_service.get_texts(user_id, (
+                'price', 'supplier', 'min_order', 'location', 'contact_quote'
+            ))
+            price_label = labels['price']
+            supplier_label = labels['supplier']
+            min_order_label = labels['min_order']
+            location_label = labels['location']
+            contact_msg = labels['contact_quote']
         else:
             header = f"🔍 **Found {len(products)} products:**"
             price_label = "Price:"
@@ -137,30 +239,34 @@ class ProductSearchService:
             location_label = "Location:"
             contact_msg = "💡 *Contact us to get detailed quotes and supplier verification!*\n\n🚚 *Logistics and shipping costs are calculated separately based on your location and order volume.*"
         
-        message = f"{header}\n\n"
+        platform_label = None
+        parts = [f"{header}\n\n"]
         
-        for i, product in enumerate(products, 1):
-            message += f"🛍️ **{product.name}**\n"
-            message += f"💰 {price_label} {product.price}\n"
-            message += f"🏭 {supplier_label} {product.supplier}\n"
-            message += f"📦 {min_order_label} {product.min_order}\n"
-            message += f"📍 {location_label} {product.supplier_location}\n"
+        for product in products:
+            parts.append(
+                f"🛍️ **{product.name}**\n"
+                f"💰 {price_label} {product.price}\n"
+                f"🏭 {supplier_label} {product.supplier}\n"
+                f"📦 {min_order_label} {product.min_order}\n"
+                f"📍 {location_label} {product.supplier_location}\n"
+            )
             if product.platform:
-                platform_label = language_service.get_text(user_id, 'platform') if language_service and user_id else "Platform:"
-                message += f"🌐 {platform_label} {product.platform}\n"
+                if platform_label is None:
+                    platform_label = language_service.get_text(user_id, 'platform') if language_service and user_id else "Platform:"
+                parts.append(f"🌐 {platform_label} {product.platform}\n")
             if product.description:
-                message += f"📝 {product.description}\n"
-            message += "\n"
+                parts.append(f"📝 {product.description}\n")
+            parts.append("\n")
         
-        message += contact_msg
-        return message
+        parts.append(contact_msg)
+        return "".join(parts)
     
-    def _search_alibaba(self, query: str) -> List[Product]:
+    async def _search_alibaba(self, query: str) -> List[Product]:
         """Поиск товаров на Alibaba.com"""
         results = []
         
         if not self.alibaba_api_key:
-            print("Alibaba API key not found, using mock data")
+            logger.warning("Alibaba API key not found, using mock data")
             return []
         
         try:
@@ -172,7 +278,7 @@ class ProductSearchService:
                 'api_key': self.alibaba_api_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            response = await self._client.get(url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -181,26 +287,26 @@ class ProductSearchService:
                         name=item.get('title', 'Unknown Product'),
                         price=f"${item.get('min_price', 0)} - ${item.get('max_price', 0)}",
                         supplier=item.get('supplier_name', 'Unknown Supplier'),
-                        min_order=f"{item.get('min_order_qty', 1)} pieces",
+                        min_order=sys.intern(f"{item.get('min_order_qty', 1)} pieces"),
                         image_url=item.get('image_url'),
                         description=item.get('description', ''),
-                        supplier_location=item.get('supplier_location', 'China'),
-                        platform="Alibaba.com",
+                        supplier_location=_intern(item.get('supplier_location', _LOCATION_CHINA)),
+                        platform=_PLATFORM_ALIBABA,
                         product_url=item.get('product_url')
                     )
                     results.append(product)
                     
         except Exception as e:
-            print(f"Error searching Alibaba: {e}")
+            logger.error("Error searching Alibaba: %s", e)
         
         return results
     
-    def _search_1688(self, query: str) -> List[Product]:
+    async def _search_1688(self, query: str) -> List[Product]:
         """Поиск товаров на 1688.com"""
         results = []
         
         if not self.api_1688_key:
-            print("1688 API key not found, using mock data")
+            logger.warning("1688 API key not found, using mock data")
             return []
         
         try:
@@ -212,7 +318,7 @@ class ProductSearchService:
                 'access_token': self.api_1688_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            response = await self._client.get(url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -221,21 +327,21 @@ class ProductSearchService:
                         name=item.get('subject', 'Unknown Product'),
                         price=f"¥{item.get('price', 0)} - ¥{item.get('retailPrice', 0)}",
                         supplier=item.get('company', 'Unknown Supplier'),
-                        min_order=f"{item.get('saledCount', 1)} pieces",
+                        min_order=sys.intern(f"{item.get('saledCount', 1)} pieces"),
                         image_url=item.get('image'),
                         description=item.get('description', ''),
-                        supplier_location=item.get('location', 'China'),
-                        platform="1688.com",
+                        supplier_location=_intern(item.get('location', _LOCATION_CHINA)),
+                        platform=_PLATFORM_1688,
                         product_url=item.get('detailUrl')
                     )
                     results.append(product)
                     
         except Exception as e:
-            print(f"Error searching 1688: {e}")
+            logger.error("Error searching 1688: %s", e)
         
         return results
     
-    def _search_made_in_china(self, query: str) -> List[Product]:
+    async def _search_made_in_china(self, query: str) -> List[Product]:
         """Парсинг товаров с Made-in-China.com"""
         results = []
         
@@ -243,50 +349,92 @@ class ProductSearchService:
             # Поиск через веб-парсинг
             search_url = f"https://www.made-in-china.com/products-search/hot-china-products/{quote(query)}.html"
             
-            response = requests.get(search_url, headers=self.headers, timeout=10)
+            response = await self._client.get(search_url)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                if HTMLParser is not None:
+                    results = self._parse_made_in_china_selectolax(response.content)
+                else:
+                    results = self._parse_made_in_china_bs4(response.content)
+            
+        except Exception as e:
+            logger.error("Error searching Made-in-China: %s", e)
+        
+        return results
+    
+    def _parse_made_in_china_selectolax(self, content: bytes) -> List[Product]:
+        """Разбор страницы поиска Made-in-China через selectolax"""
+        results = []
+        
+        for item in HTMLParser(content).css('div.item-main')[:5]:
+            try:
+                # css_first возвращает None, если элемент не найден
+                title_elem = item.css_first('h2.title')
+                title = title_elem.text(strip=True) if title_elem else 'Unknown Product'
                 
-                # Парсинг результатов поиска
-                product_items = soup.find_all('div', class_='item-main')[:5]
+                price_elem = item.css_first('span.price')
+                price = price_elem.text(strip=True) if price_elem else 'Contact for price'
                 
-                for item in product_items:
-                    try:
-                        # Извлечение данных товара
-                        title_elem = item.find('h2', class_='title')
-                        title = title_elem.get_text(strip=True) if title_elem else 'Unknown Product'
-                        
-                        price_elem = item.find('span', class_='price')
-                        price = price_elem.get_text(strip=True) if price_elem else 'Contact for price'
-                        
-                        supplier_elem = item.find('a', class_='company')
-                        supplier = supplier_elem.get_text(strip=True) if supplier_elem else 'Unknown Supplier'
-                        
-                        img_elem = item.find('img')
-                        image_url = img_elem.get('src') if img_elem else None
-                        
-                        link_elem = item.find('a', href=True)
-                        product_url = f"https://www.made-in-china.com{link_elem['href']}" if link_elem else None
-                        
-                        product = Product(
-                            name=title,
-                            price=price,
-                            supplier=supplier,
-                            min_order="Contact supplier",
-                            image_url=image_url,
-                            description="",
-                            supplier_location="China",
-                            platform="Made-in-China.com",
-                            product_url=product_url
-                        )
-                        results.append(product)
-                        
-                    except Exception as e:
-                        print(f"Error parsing product item: {e}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error searching Made-in-China: {e}")
+                supplier_elem = item.css_first('a.company')
+                supplier = supplier_elem.text(strip=True) if supplier_elem else 'Unknown Supplier'
+                
+                img_elem = item.css_first('img')
+                image_url = img_elem.attributes.get('src') if img_elem else None
+                
+                link_elem = item.css_first('a[href]')
+                product_url = f"https://www.made-in-china.com{link_elem.attributes['href']}" if link_elem else None
+                
+                results.append(self._made_in_china_product(title, price, supplier, image_url, product_url))
+                
+            except Exception as e:
+                logger.error("Error parsing product item: %s", e)
+                continue
+        
+        return results
+    
+    def _parse_made_in_china_bs4(self, content: bytes) -> List[Product]:
+        """Разбор страницы поиска Made-in-China через BeautifulSoup"""
+        results = []
+        
+        soup = BeautifulSoup(content, HTML_PARSER, parse_only=self.MADE_IN_CHINA_STRAINER)
+        
+        for item in soup.find_all('div', class_='item-main')[:5]:
+            try:
+                # Извлечение данных товара
+                title_elem = item.find('h2', class_='title')
+                title = title_elem.get_text(strip=True) if title_elem else 'Unknown Product'
+                
+                price_elem = item.find('span', class_='price')
+                price = price_elem.get_text(strip=True) if price_elem else 'Contact for price'
+                
+                supplier_elem = item.find('a', class_='company')
+                supplier = supplier_elem.get_text(strip=True) if supplier_elem else 'Unknown Supplier'
+                
+                img_elem = item.find('img')
+                image_url = img_elem.get('src') if img_elem else None
+                
+                link_elem = item.find('a', href=True)
+                product_url = f"https://www.made-in-china.com{link_elem['href']}" if link_elem else None
+                
+                results.append(self._made_in_china_product(title, price, supplier, image_url, product_url))
+                
+            except Exception as e:
+                logger.error("Error parsing product item: %s", e)
+                continue
         
         return results
+    
+    @staticmethod
+    def _made_in_china_product(title: str, price: str, supplier: str, image_url: Optional[str], product_url: Optional[str]) -> Product:
+        """Товар Made-in-China из извлечённых полей карточки"""
+        return Product(
+            name=title,
+            price=price,
+            supplier=supplier,
+            min_order=_MIN_ORDER_CONTACT,
+            image_url=image_url,
+            description="",
+            supplier_location=_LOCATION_CHINA,
+            platform=_PLATFORM_MADE_IN_CHINA,
+            product_url=product_url
+        )
@@ -1,9 +1,10 @@
-import requests
 from typing import Dict, Optional
 from dataclasses import dataclass
+from functools import cached_property
 from datetime import datetime
+from .fuzzy_match import best_match
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SupplierInfo:
     company_name: str
     registration_status: str
@@ -17,8 +18,10 @@ class SupplierInfo:
     contact_info: Dict[str, str]
 
 class SupplierVerificationService:
-    def __init__(self):
-        self.mock_suppliers = {
+    @cached_property
+    def mock_suppliers(self) -> Dict[str, SupplierInfo]:
+        """Mock supplier records, built on first access"""
+        return {
             "shenzhen audio tech co": SupplierInfo(
                 company_name="Shenzhen Audio Tech Co., Ltd",
                 registration_status="✅ Verified",
@@ -84,42 +87,47 @@ class SupplierVerificationService:
         
         return None
     
+    def suggest_supplier(self, company_name: str) -> Optional[str]:
+        """Closest known company name for an unverified query (a hint only, never verified)"""
+        match = best_match(company_name.lower().strip(), self.mock_suppliers.keys())
+        return self.mock_suppliers[match].company_name if match is not None else None
+    
     def format_verification_report(self, supplier: SupplierInfo, language_service=None, user_id=None) -> str:
         """Format supplier verification into a readable report"""
         if language_service and user_id:
-            header = language_service.get_text(user_id, 'verification_report')
-            company_label = language_service.get_text(user_id, 'company')
-            status_label = language_service.get_text(user_id, 'status')
-            location_label = language_service.get_text(user_id, 'location')
+            labels = language_service.get_texts(user_id, (
+                'verification_report', 'company', 'status', 'location'
+            ))
+            header = labels['verification_report']
+            company_label = labels['company']
+            status_label = labels['status']
+            location_label = labels['location']
         else:
             header = "🏢 **Supplier Verification Report**"
             company_label = "Company:"
             status_label = "Status:"
             location_label = "Location:"
         
-        report = f"{header}\n\n"
-        report += f"**{company_label}** {supplier.company_name}\n"
-        report += f"**{status_label}** {supplier.registration_status}\n"
-        report += f"**License:** {supplier.business_license}\n"
-        report += f"**Experience:** {supplier.years_in_business} years\n"
-        report += f"**{location_label}** {supplier.location}\n"
-        report += f"**Risk Level:** {supplier.risk_level}\n"
-        report += f"**Score:** {supplier.verification_score}/100\n\n"
-        
-        report += f"**Main Products:**\n{supplier.main_products}\n\n"
-        
-        report += f"**Certifications:**\n"
-        for cert in supplier.certifications:
-            report += f"• {cert}\n"
-        
-        report += f"\n**Contact Information:**\n"
-        report += f"📧 {supplier.contact_info.get('email', 'N/A')}\n"
-        report += f"📞 {supplier.contact_info.get('phone', 'N/A')}\n"
-        report += f"🌐 {supplier.contact_info.get('website', 'N/A')}\n"
-        
-        report += f"\n💡 *Report generated on {datetime.now().strftime('%Y-%m-%d %H:%M')}*"
+        certifications = "".join([f"• {cert}\n" for cert in supplier.certifications])
         
-        return report
+        return (
+            f"{header}\n\n"
+            f"**{company_label}** {supplier.company_name}\n"
+            f"**{status_label}** {supplier.registration_status}\n"
+            f"**License:** {supplier.business_license}\n"
+            f"**Experience:** {supplier.years_in_business} years\n"
+            f"**{location_label}** {supplier.location}\n"
+            f"**Risk Level:** {supplier.risk_level}\n"
+            f"**Score:** {supplier.verification_score}/100\n\n"
+            f"**Main Products:**\n{supplier.main_products}\n\n"
+            f"**Certifications:**\n"
+            f"{certifications}"
+            f"\n**Contact Information:**\n"
+            f"📧 {supplier.contact_info.get('email', 'N/A')}\n"
+            f"📞 {supplier.contact_info.get('phone', 'N/A')}\n"
+            f"🌐 {supplier.contact_info.get('website', 'N/A')}\n"
+            f"\n💡 *Report generated on {datetime.now():%Y-%m-%d %H:%M}*"
+        )
     
     def get_risk_assessment(self, supplier: SupplierInfo, language_service=None, user_id=None) -> str:
         """Get detailed risk assessment"""
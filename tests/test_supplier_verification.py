@@ -0,0 +1,33 @@
+import unittest
+
+from services.supplier_verification import SupplierVerificationService
+
+class VerifySupplierTest(unittest.TestCase):
+    def setUp(self):
+        self.service = SupplierVerificationService()
+
+    def test_exact_match(self):
+        supplier = self.service.verify_supplier("  Shenzhen Audio Tech Co ")
+        self.assertEqual(supplier.company_name, "Shenzhen Audio Tech Co., Ltd")
+
+    def test_partial_match_returns_earliest_supplier(self):
+        # Ключи пересекаются в запросе: побеждает первый по порядку поставщик
+        self.service.mock_suppliers = {"tech co": "A", "audio tech": "B"}
+        self.assertEqual(self.service.verify_supplier("shenzhen audio tech co"), "A")
+
+    def test_query_contained_in_key(self):
+        supplier = self.service.verify_supplier("guangzhou cable")
+        self.assertEqual(supplier.company_name, "Guangzhou Cable Manufacturing Ltd")
+
+    def test_misspelled_name_is_not_verified(self):
+        self.assertIsNone(self.service.verify_supplier("shenzen audio tech co"))
+        self.assertEqual(
+            self.service.suggest_supplier("shenzen audio tech co"),
+            "Shenzhen Audio Tech Co., Ltd"
+        )
+
+    def test_no_suggestion_for_unrelated_name(self):
+        self.assertIsNone(self.service.suggest_supplier("acme trading"))
+
+if __name__ == "__main__":
+    unittest.main()